@@ -0,0 +1,124 @@
+import asyncio
+import time
+from bisect import bisect_right, insort
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+import db
+from config import ALERT_HYSTERESIS, ALERT_COOLDOWN, ALERT_POLL_INTERVAL, EXCHANGE_STREAM_MAX_AGE, TAKER_FEES
+from arbitrage import arbitrage_matrix, taker_fee
+
+# arb_alerts.threshold is NUMERIC(10, 4)
+THRESHOLD_STEP = Decimal("0.0001")
+THRESHOLD_LIMIT = Decimal(10) ** 6
+
+def normalize_threshold(threshold):
+    """`threshold` rounded the way the arb_alerts column stores it (half away from zero, like PostgreSQL),
+    so memory and the database agree; ValueError unless that lies in [THRESHOLD_STEP, THRESHOLD_LIMIT)."""
+    if threshold.is_finite() and threshold < THRESHOLD_LIMIT:
+        threshold = threshold.quantize(THRESHOLD_STEP, rounding=ROUND_HALF_UP)
+        if THRESHOLD_STEP <= threshold < THRESHOLD_LIMIT:
+            return threshold
+    raise ValueError(f"Threshold must be a percentage from {THRESHOLD_STEP} to below {THRESHOLD_LIMIT:,}.")
+
+def net_spread_pct(opportunity, fees=TAKER_FEES):
+    """Top-of-book spread in % of the buy price, after both venues' taker fees."""
+    cost = opportunity.buy_price * (1 + taker_fee(fees, opportunity.buy_exchange))
+    proceeds = opportunity.sell_price * (1 - taker_fee(fees, opportunity.sell_exchange))
+    return (proceeds - cost) * 100 / cost
+
+class AlertWatcher:
+    """Pushes a message to subscribed channels when the best cross-venue spread crosses their threshold.
+
+    Subscriptions live in a sorted list, so each tick finds the newly crossed ones with one
+    bisect instead of scanning them all. A subscription fires once, then stays quiet until
+    the spread drops ALERT_HYSTERESIS points below its threshold and ALERT_COOLDOWN has passed.
+    """
+
+    def __init__(self, send):
+        self.send = send  # async send(channel_id, message)
+        self._thresholds = []  # Sorted (threshold, channel_id)
+        self._fired = {}  # (threshold, channel_id) -> time it last alerted; present while disarmed
+        self._quotes = {}  # exchange name -> latest Quote, dropped once older than EXCHANGE_STREAM_MAX_AGE
+        self._sending = set()  # Alert sends in flight; referenced so they aren't garbage-collected mid-send
+
+    async def load(self):
+        self._thresholds = sorted((normalize_threshold(Decimal(threshold)), channel_id)
+                                  for channel_id, threshold in await db.fetch("select_arb_alerts"))
+        print(f"Loaded {len(self._thresholds)} arbitrage alert subscriptions")
+
+    async def add(self, channel_id, guild_id, threshold, user_id):
+        threshold = normalize_threshold(threshold)
+        await db.execute("insert_arb_alert", channel_id, guild_id, threshold, user_id, datetime.utcnow())
+        if (threshold, channel_id) not in self._thresholds:
+            insort(self._thresholds, (threshold, channel_id))
+
+    async def remove(self, channel_id, threshold=None):
+        if threshold is None:
+            await db.execute("delete_channel_arb_alerts", channel_id)
+            removed = [entry for entry in self._thresholds if entry[1] == channel_id]
+        else:
+            threshold = normalize_threshold(threshold)
+            await db.execute("delete_arb_alert", channel_id, threshold)
+            removed = [entry for entry in self._thresholds if entry == (threshold, channel_id)]
+        for entry in removed:
+            self._thresholds.remove(entry)
+            self._fired.pop(entry, None)
+        return len(removed)
+
+    @property
+    def subscription_count(self):
+        return len(self._thresholds)
+
+    def channel_thresholds(self, channel_id):
+        return [threshold for threshold, channel in self._thresholds if channel == channel_id]
+
+    def on_quote(self, quote):
+        """Stream listener: re-evaluates on every quote update."""
+        self._quotes[quote.exchange] = quote
+        self.evaluate()
+
+    def on_quotes(self, quotes):
+        """REST poll listener: a venue that didn't answer this round drops out instead of keeping its old price."""
+        self._quotes = dict(quotes)
+        self.evaluate()
+
+    def evaluate(self):
+        # A venue whose feed went quiet must not keep alerting against its frozen price
+        self._quotes = {name: quote for name, quote in self._quotes.items()
+                        if quote.age <= EXCHANGE_STREAM_MAX_AGE and not quote.stale}
+        opportunities = arbitrage_matrix(self._quotes)
+        if not opportunities:
+            return
+        best = max(opportunities, key=net_spread_pct)
+        spread = net_spread_pct(best)
+        now = time.monotonic()
+
+        # Re-arm: only disarmed subscriptions need looking at, not the whole index
+        for entry, fired_at in list(self._fired.items()):
+            if spread < entry[0] - ALERT_HYSTERESIS and now - fired_at >= ALERT_COOLDOWN:
+                del self._fired[entry]
+
+        crossed = self._thresholds[:bisect_right(self._thresholds, (spread, float("inf")))]
+        for entry in crossed:
+            if entry in self._fired:
+                continue
+            self._fired[entry] = now
+            threshold, channel_id = entry
+            message = (f"🚨 **CAW arbitrage above {threshold}%:** buy on {best.buy_exchange} at {best.buy_price:.11f}, "
+                       f"sell on {best.sell_exchange} at {best.sell_price:.11f} → **{spread:.2f}%** after fees")
+            task = asyncio.create_task(self.send(channel_id, message))
+            self._sending.add(task)
+            task.add_done_callback(self._sent)
+
+    def _sent(self, task):
+        self._sending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Alert send failed: {task.exception()!r}")
+
+async def poll_quotes_forever(watcher, fetch_quotes):
+    """Feeds REST quotes to the watcher when the streaming feed is off."""
+    while True:
+        if watcher.subscription_count:
+            quotes, _ = await fetch_quotes()
+            watcher.on_quotes(quotes)
+        await asyncio.sleep(ALERT_POLL_INTERVAL)
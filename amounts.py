@@ -0,0 +1,24 @@
+from decimal import Context, Decimal, InvalidOperation
+
+# Wide enough for any uint256 token amount, so conversions never round
+EXACT = Context(prec=80)
+
+def to_price(value):
+    """Parses an API price (string or Decimal from JSON) without a float round-trip."""
+    if value in (None, ""):
+        raise ValueError("missing price")
+    try:
+        return value if isinstance(value, Decimal) else Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError(f"invalid price {value!r}") from None
+
+def from_wei(wei, decimals):
+    """Exact token amount from an integer base-unit amount (e.g. wei for 18 decimals)."""
+    return EXACT.scaleb(Decimal(wei), -decimals)
+
+def percentage(part_wei, whole_wei):
+    return EXACT.divide(Decimal(part_wei) * 100, Decimal(whole_wei))
+
+def to_wei(amount, decimals):
+    """Integer base units from an exact token amount (inverse of from_wei)."""
+    return int(EXACT.scaleb(Decimal(amount), decimals))
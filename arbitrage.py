@@ -0,0 +1,116 @@
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from heapq import merge
+from itertools import accumulate
+from decimal import Decimal
+from config import DEFAULT_TAKER_FEE
+
+@dataclass(frozen=True)
+class Opportunity:
+    """Buy on `buy_exchange` at its ask, sell on `sell_exchange` at its bid."""
+    buy_exchange: str
+    sell_exchange: str
+    buy_price: Decimal
+    sell_price: Decimal
+
+    @property
+    def spread(self):
+        return self.sell_price - self.buy_price
+
+    @property
+    def profitable(self):
+        return self.spread > 0
+
+    def profit(self, amount):
+        return amount * self.spread
+
+def arbitrage_matrix(quotes):
+    """Every ordered venue pair from a {name: Quote} dict, in display order."""
+    return [
+        Opportunity(buy.exchange, sell.exchange, buy.ask, sell.bid)
+        for buy in quotes.values()
+        for sell in quotes.values()
+        if buy is not sell
+    ]
+
+def best_route(quotes):
+    """The pair with the widest spread, or None if fewer than two venues answered."""
+    return max(arbitrage_matrix(quotes), key=lambda o: o.spread, default=None)
+
+# 📌 Depth-aware sizing
+
+def taker_fee(fees, exchange):
+    """`exchange`'s fee from `fees`, or DEFAULT_TAKER_FEE when it isn't listed."""
+    return fees.get(exchange, DEFAULT_TAKER_FEE)
+
+@dataclass(frozen=True)
+class SizedOpportunity:
+    """Best fill for buying on `buy_exchange`'s asks and selling into `sell_exchange`'s bids, after taker fees."""
+    buy_exchange: str
+    sell_exchange: str
+    size: Decimal  # CAW; 0 when even the first unit loses money
+    buy_vwap: Decimal
+    sell_vwap: Decimal
+    cost: Decimal  # USDT paid, fees included
+    revenue: Decimal  # USDT received, fees deducted
+
+    @property
+    def profit(self):
+        return self.revenue - self.cost
+
+class _Side:
+    """One side of a book with cumulative quantity/notional, built once and shared by every pair."""
+
+    def __init__(self, levels):
+        self.prices = [price for price, _ in levels]
+        self.cum_qty = list(accumulate(qty for _, qty in levels))
+        self.cum_notional = list(accumulate(price * qty for price, qty in levels))
+
+    @property
+    def total(self):
+        return self.cum_qty[-1] if self.cum_qty else Decimal(0)
+
+    def price_at(self, filled):
+        """Price of the level that the next unit after `filled` comes from."""
+        return self.prices[bisect_right(self.cum_qty, filled)]
+
+    def notional(self, size):
+        """Quote-currency value of filling `size` from the top of this side."""
+        i = bisect_left(self.cum_qty, size)
+        before_qty = self.cum_qty[i - 1] if i else 0
+        before_notional = self.cum_notional[i - 1] if i else 0
+        return before_notional + (size - before_qty) * self.prices[i]
+
+def _size_pair(asks, bids, buy_fee, sell_fee):
+    """Largest size where every marginal unit still sells (after fees) for more than it costs."""
+    limit = min(asks.total, bids.total)
+    size = Decimal(0)
+    # Marginal prices only change at the union of both sides' cumulative level boundaries
+    for boundary in merge(asks.cum_qty, bids.cum_qty):
+        if boundary <= size:
+            continue
+        if bids.price_at(size) * (1 - sell_fee) <= asks.price_at(size) * (1 + buy_fee):
+            break
+        size = min(boundary, limit)
+        if size == limit:
+            break
+    return size
+
+def size_opportunities(books, fees):
+    """Depth-aware opportunity for every ordered venue pair from a {name: OrderBook} dict, in one batch."""
+    sides = {name: (_Side(book.asks), _Side(book.bids)) for name, book in books.items()}
+    opportunities = []
+    for buy_name, (asks, _) in sides.items():
+        for sell_name, (_, bids) in sides.items():
+            if buy_name == sell_name:
+                continue
+            buy_fee, sell_fee = taker_fee(fees, buy_name), taker_fee(fees, sell_name)
+            size = _size_pair(asks, bids, buy_fee, sell_fee)
+            if size:
+                buy_notional, sell_notional = asks.notional(size), bids.notional(size)
+                opportunities.append(SizedOpportunity(
+                    buy_name, sell_name, size, buy_notional / size, sell_notional / size,
+                    buy_notional * (1 + buy_fee), sell_notional * (1 - sell_fee)))
+            else:
+                opportunities.append(SizedOpportunity(buy_name, sell_name, Decimal(0), asks.prices[0], bids.prices[0], Decimal(0), Decimal(0)))
+    return opportunities
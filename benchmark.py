@@ -0,0 +1,164 @@
+import argparse
+import asyncio
+import math
+import os
+import random
+import shutil
+import socket
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from aiohttp import web
+import mock_upstreams
+
+# 📌 (label, command, args) run by default; `!compare_cdc_<n>` is the same handler as compare_cdc.
+# The hub's pollers aren't started (they would add their own upstream load), so it has no alert
+# watcher and the !alert commands can't be benchmarked.
+SCENARIOS = [
+    ("ex", "ex", ()),
+    ("cdc", "cdc", ()),
+    ("cdc fresh", "cdc", ("fresh",)),
+    ("price caw", "price", ("caw",)),
+    ("compare_cdc 24", "compare_cdc", (24,)),
+    ("compare_cdc_last10", "compare_cdc_last10", ()),
+    ("cdc_history 30", "cdc_history", (30, 15)),
+    ("cdc_history 365", "cdc_history", (365, 15)),
+    ("cdc_flow 3650", "cdc_flow", (3650,)),
+    ("spread_history 60", "spread_history", (60,)),
+]
+
+class FakeContext:
+    """Just enough of commands.Context for the handlers: keeps what they send."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append(content)
+
+def percentile(sorted_values, q):
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+async def seed_history(days):
+    """Hourly CAW balance snapshots of the default wallets for the last `days` days, slowly draining, plus their rollups."""
+    import db
+    import rollups
+    from config import DEFAULT_WALLETS
+    from snapshots import snapshot_bucket
+    from tracking import DEFAULT_SYMBOL, current
+
+    await current()  # Seeds the tracked tokens and wallets
+    now = snapshot_bucket(datetime.now(timezone.utc).replace(tzinfo=None))
+    addresses = [address.lower() for address, _, _ in DEFAULT_WALLETS]
+    rows = []
+    for hour in range(days * 24, 0, -1):
+        bucket = now - timedelta(hours=hour)
+        balances = [Decimal(base - hour * step) for base, step in
+                    ((61_234_567_890_123, 1_000_000_000), (48_765_432_109_876, 700_000_000),
+                     (23_456_789_012_345, 300_000_000), (389_012_345_678_901, 0))]
+        rows.extend((bucket, DEFAULT_SYMBOL, address, balance) for address, balance in zip(addresses, balances))
+    await db.execute_many("upsert_wallet_balance", rows)
+    await rollups.backfill()
+
+def seed_ticks(minutes):
+    """A tick every 5 seconds per venue over the last `minutes`, around the recorded top of book."""
+    from compare import load_fixtures, FIXTURES_DIR
+    from exchanges import Quote
+    from ticks import recorder
+
+    quotes, _ = load_fixtures(FIXTURES_DIR, "ticker")
+    now = time.time()
+    for ts in range(int(now - minutes * 60), int(now), 5):
+        for quote in quotes.values():
+            drift = Decimal(1 + random.uniform(-0.01, 0.01))
+            recorder.record(Quote(quote.exchange, quote.bid * drift, quote.ask * drift, received_at=ts))
+
+async def run_scenario(command, args, requests, concurrency):
+    """Latencies of `requests` calls at `concurrency` in flight, the wall time, errors and one reply."""
+    from scheduler import PRIORITY, INTERACTIVE
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors, replies = [], [], []
+
+    async def call():
+        PRIORITY.set(INTERACTIVE)  # As the bot's before_invoke hook does
+        ctx = FakeContext()
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await command(ctx, *args)
+            except Exception as e:
+                errors.append(e)
+            latencies.append(time.perf_counter() - start)
+        replies.extend(ctx.sent)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(requests)))
+    return sorted(latencies), time.perf_counter() - start, errors, replies[:1]
+
+async def run(args, sock):
+    # Imported only now: config reads the overrides from the environment at import time
+    import db
+    from discord_bot_price import bot, load_extensions
+    from upstream import close_session
+
+    app = mock_upstreams.make_app(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.SockSite(runner, sock).start()
+    await asyncio.to_thread(db.init_pool, os.environ["DATABASE_URL"])
+    try:
+        await seed_history(args.history_days)
+        seed_ticks(120)
+        await load_extensions()  # Only registers the commands; seed_history already backfilled the rollups
+
+        print(f"{'command':<20} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for label, name, command_args in SCENARIOS:
+            if args.only and label.split()[0] not in args.only:
+                continue
+            latencies, elapsed, errors, replies = await run_scenario(bot.get_command(name), command_args,
+                                                                     args.requests, args.concurrency)
+            print(f"{label:<20} {len(latencies) / elapsed:>9.1f} {percentile(latencies, 0.5) * 1000:>9.2f} "
+                  f"{percentile(latencies, 0.99) * 1000:>9.2f} {len(errors):>7}")
+            if args.show:
+                for reply in replies:
+                    print(reply)
+                if errors:
+                    print(f"First error: {errors[0]!r}")
+    finally:
+        for extension in list(bot.extensions):
+            await bot.unload_extension(extension)
+        await close_session()
+        await runner.cleanup()
+        await asyncio.to_thread(db.close_pool)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the bot's command handlers against local stand-ins for every upstream.")
+    parser.add_argument("--requests", type=int, default=200, help="calls per command")
+    parser.add_argument("--concurrency", type=int, default=10, help="calls in flight at once")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every upstream response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random upstream delay of up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of upstream requests answered with a 503")
+    parser.add_argument("--no-cache", action="store_true", help="turn the quote caches off so every call reaches the upstreams")
+    parser.add_argument("--history-days", type=int, default=90, help="days of hourly CDC snapshots to seed")
+    parser.add_argument("--only", nargs="+", help="commands to run, e.g. --only ex cdc_history")
+    parser.add_argument("--show", action="store_true", help="print one reply per command")
+    args = parser.parse_args()
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    workdir = tempfile.mkdtemp(prefix="caw-bench-")
+    os.environ.update({
+        "UPSTREAM_HTTP_OVERRIDE": f"http://127.0.0.1:{sock.getsockname()[1]}/http",
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "CMC_API_KEY": "benchmark",
+        "API_KEY_CRONOSCAN": "benchmark",
+        "EXCHANGE_STREAMING": "0",
+        "METRICS_PORT": "0",
+    })
+    if args.no_cache:
+        os.environ.update({"EXCHANGE_CACHE_TTL": "0", "DEPTH_CACHE_TTL": "0", "CMC_CACHE_TTL": "0", "CMC_MISSING_TTL": "0"})
+    try:
+        asyncio.run(run(args, sock))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,90 @@
+import asyncio
+import time
+from collections import OrderedDict
+from config import CACHE_TTLS, CACHE_MAX_ENTRIES
+
+class QuoteCache:
+    """In-process TTL cache with LRU eviction and request coalescing.
+
+    Concurrent lookups of a missing key share one in-flight fetch, so a burst of
+    identical commands costs a single upstream request. Failed fetches are not cached.
+    Expired entries stay until evicted, as the last good value to show while the upstream is down.
+    """
+
+    def __init__(self, ttl, max_entries=CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+        self._inflight = {}  # key -> asyncio.Task
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key):
+        """Returns a fresh cached value or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if stored_at + self.ttl < time.monotonic():
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def get_stale(self, key, max_age):
+        """Returns the last value fetched for `key`, expired or not, if it is at most `max_age` seconds old."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] + max_age < time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, key, value):
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        """Drops `key` so the next lookup fetches it again."""
+        self._entries.pop(key, None)
+
+    async def get_or_fetch(self, key, fetch):
+        """Returns the cached value for `key`, or awaits `fetch()` (shared by concurrent callers) and caches it."""
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.create_task(self._fetch(key, fetch))
+            self._inflight[key] = task
+        else:
+            self.coalesced += 1
+        # Shield so a caller hitting its own deadline doesn't cancel the fetch for everyone else
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key, fetch):
+        try:
+            value = await fetch()
+            if value is not None:
+                self.set(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced, "entries": len(self._entries)}
+
+# 📌 One cache per upstream source, TTLs from config.CACHE_TTLS
+_caches = {}
+
+def get_cache(source):
+    if source not in _caches:
+        _caches[source] = QuoteCache(CACHE_TTLS[source])
+    return _caches[source]
+
+def cache_stats():
+    """Hit/miss counters for every cache created so far, keyed by source."""
+    return {source: cache.stats() for source, cache in _caches.items()}
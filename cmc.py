@@ -0,0 +1,160 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field, replace
+from decimal import Decimal
+import aiohttp
+from config import CMC_TIMEOUT, CMC_BATCH_WINDOW, CMC_BATCH_MAX, CMC_INDEX_REFRESH, STALE_MAX_AGE
+from upstream import get_json
+from cache import get_cache
+from amounts import to_price
+
+CMC_API_KEY = os.getenv("CMC_API_KEY")  # CoinMarketCap API Key
+CMC_BASE_URL = "https://pro-api.coinmarketcap.com/v1"
+CMC_API_URL = f"{CMC_BASE_URL}/cryptocurrency/quotes/latest"
+CMC_MAP_URL = f"{CMC_BASE_URL}/cryptocurrency/map"
+
+class CMCError(Exception):
+    pass
+
+@dataclass(frozen=True)
+class CoinQuote:
+    symbol: str
+    name: str
+    price: Decimal
+    market_cap: Decimal
+    received_at: float = field(default_factory=time.time)  # Epoch seconds
+    stale: bool = False  # Last good quote, served because CoinMarketCap is failing right now
+
+    @property
+    def age(self):
+        return time.time() - self.received_at
+
+async def _cmc_get(url, params):
+    if not CMC_API_KEY:
+        raise CMCError("CMC_API_KEY is not set")
+    try:
+        data = await get_json(url, CMC_TIMEOUT, params=params, headers={"X-CMC_PRO_API_KEY": CMC_API_KEY, "Accept": "application/json"})
+    except asyncio.TimeoutError:
+        raise CMCError(f"CoinMarketCap timed out after {CMC_TIMEOUT:g}s")
+    except aiohttp.ClientError as e:
+        raise CMCError(f"API request error: {e}")
+    status = data.get("status") or {}
+    if status.get("error_code"):
+        raise CMCError(status.get("error_message") or "CoinMarketCap error")
+    return data.get("data")
+
+# 📌 Symbol -> CMC id index (highest ranked coin wins for ambiguous tickers)
+_symbol_ids = {}
+
+async def load_symbol_index():
+    """Downloads the CMC id map (1 credit) and rebuilds the symbol index."""
+    global _symbol_ids
+    coins = await _cmc_get(CMC_MAP_URL, {"listing_status": "active", "sort": "cmc_rank"})
+    index = {}
+    for coin in coins or []:
+        index.setdefault(coin["symbol"].upper(), coin["id"])  # Sorted by rank, so the first one is the main coin
+    _symbol_ids = index
+    print(f"Loaded {len(index)} CoinMarketCap symbols")
+
+async def refresh_symbol_index_forever():
+    """Background task: loads the index at startup, then refreshes it every CMC_INDEX_REFRESH seconds."""
+    while True:
+        try:
+            await load_symbol_index()
+        except CMCError as e:
+            print(f"Could not load CoinMarketCap symbol index: {e}")
+        await asyncio.sleep(CMC_INDEX_REFRESH)
+
+def _parse_quote(coin):
+    usd = coin["quote"]["USD"]
+    price, market_cap = usd.get("price"), usd.get("market_cap")
+    return CoinQuote(coin["symbol"], coin["name"],
+                     to_price(price) if price is not None else None,
+                     to_price(market_cap) if market_cap is not None else None)
+
+class QuoteBatcher:
+    """Merges lookups that arrive within CMC_BATCH_WINDOW seconds into one quotes/latest call."""
+
+    def __init__(self, window=CMC_BATCH_WINDOW):
+        self.window = window
+        self._pending = {}  # symbol -> Future
+        self._flush_handle = None
+
+    def request(self, symbol):
+        future = self._pending.get(symbol)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[symbol] = future
+        if len(self._pending) >= CMC_BATCH_MAX:
+            self._schedule(0)
+        elif self._flush_handle is None:
+            self._schedule(self.window)
+        return future
+
+    def _schedule(self, delay):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        self._flush_handle = asyncio.get_running_loop().call_later(delay, lambda: asyncio.create_task(self._flush()))
+
+    async def _flush(self):
+        self._flush_handle = None
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+
+        # Known symbols go by id (unambiguous); anything missing from the index falls back to `symbol=`
+        by_id = {_symbol_ids[s]: s for s in batch if s in _symbol_ids}
+        unknown = [s for s in batch if s not in _symbol_ids]
+        results = {}
+        try:
+            if by_id:
+                data = await _cmc_get(CMC_API_URL, {"id": ",".join(map(str, by_id))})
+                for coin_id, coin in (data or {}).items():
+                    results[by_id[int(coin_id)]] = _parse_quote(coin)
+            if unknown:
+                data = await _cmc_get(CMC_API_URL, {"symbol": ",".join(unknown), "skip_invalid": "true"})
+                for symbol, coin in (data or {}).items():
+                    coin = coin[0] if isinstance(coin, list) else coin
+                    results[symbol.upper()] = _parse_quote(coin)
+        except Exception as e:
+            # Anything else (a non-JSON body, an unexpected shape) must fail the lookups too, or
+            # they never finish and every later lookup of the symbol coalesces onto them
+            error = e if isinstance(e, CMCError) else CMCError(f"Unexpected CoinMarketCap response: {e!r}")
+            for symbol, future in batch.items():
+                if future.done():
+                    continue
+                if symbol in results:  # Answered by the call that succeeded
+                    future.set_result(results[symbol])
+                else:
+                    future.set_exception(error)
+            return
+
+        for symbol, future in batch.items():
+            if not future.done():
+                future.set_result(results.get(symbol))
+
+_batcher = QuoteBatcher()
+
+async def get_coin_quote(symbol):
+    """Cached, coalesced and batched USD quote for `symbol`; None if CMC doesn't know it.
+
+    Unknown symbols are remembered for the "cmc_missing" TTL, so repeating them costs no credits.
+    While CoinMarketCap fails, the last good quote (at most STALE_MAX_AGE seconds old) is returned
+    marked stale; without one the CMCError is raised.
+    """
+    symbol = symbol.upper()
+    cache, missing = get_cache("cmc"), get_cache("cmc_missing")
+    if missing.get(symbol):
+        return None
+    try:
+        quote = await cache.get_or_fetch(symbol, lambda: _batcher.request(symbol))
+        if quote is None:
+            missing.set(symbol, True)
+        return quote
+    except CMCError as e:
+        last_good = cache.get_stale(symbol, STALE_MAX_AGE)
+        if last_good is None:
+            raise
+        print(f"CoinMarketCap error, serving the last good {symbol} quote: {e}")
+        return replace(last_good, stale=True)
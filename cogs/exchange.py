@@ -0,0 +1,113 @@
+import traceback
+from decimal import Decimal
+from discord.ext import commands
+from config import DEPTH_REFRESH_INTERVAL, EXCHANGE_STREAMING
+from exchanges import VENUES
+from alerts import normalize_threshold
+from hub import service
+from formatting import format_age, format_billions
+
+def format_threshold(threshold):
+    return f"{threshold.normalize():f}"  # 1.5000 -> 1.5, without switching to 1E+2 for 100
+
+class Exchange(commands.Cog):
+    """CAW/USDT quotes across exchanges, arbitrage sizing and spread alerts."""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.command()
+    async def ex(self, ctx):
+        """Fetches and compares the ask and bid prices for CAW/USDT on every configured exchange."""
+        quotes, errors, opportunities, book_errors = await service.market()
+
+        if not quotes:
+            await ctx.send("❌ Failed to fetch exchange data from all sources.")
+            return
+
+        message = "--- CAW/USDT Exchange Comparison ---\n"
+        message += "---------------------------------------\n"
+        for adapter in VENUES:
+            message += f"**{adapter.name}:**\n"
+            if adapter.name in quotes:
+                quote = quotes[adapter.name]
+                message += f"  Selling Price (Ask): {quote.ask:.11f}\n"
+                message += f"  Buying Price (Bid): {quote.bid:.11f}\n"
+                if quote.stale:
+                    message += f"  ⚠️ Stale: last good quote from {format_age(quote.age)} ago ({errors[adapter.name]})\n"
+                elif EXCHANGE_STREAMING:
+                    message += f"  Updated: {quote.age:.0f}s ago\n"
+            else:
+                message += f"  Error: {errors[adapter.name]}\n"
+            message += "---------------------------------------\n"
+
+        # Depth-aware arbitrage: walk both order books, after taker fees
+        if EXCHANGE_STREAMING:
+            message += f"\n--- Arbitrage Opportunities (order books refreshed every {DEPTH_REFRESH_INTERVAL:g}s, after fees) ---\n"
+        else:
+            message += "\n--- Arbitrage Opportunities (order book depth, after fees) ---\n"
+        for opportunity in opportunities:
+            buy_exchange, sell_exchange = opportunity.buy_exchange, opportunity.sell_exchange
+            if opportunity.size:
+                message += f"Buy on {buy_exchange}, sell on {sell_exchange}:\n"
+                message += f"  Max profitable size: {format_billions(opportunity.size)} CAW\n"
+                message += f"  Avg Buy Price: {opportunity.buy_vwap:.11f} / Avg Sell Price: {opportunity.sell_vwap:.11f}\n"
+                message += f"  Cost: {opportunity.cost:.2f} USDT, Revenue: {opportunity.revenue:.2f} USDT\n"
+                message += f"  Net Profit: {opportunity.profit:.2f} USDT\n"
+            else:
+                message += f"No profitable size (Buy from {buy_exchange} -> Sell to {sell_exchange}) after fees.\n"
+            message += "---------------------------------------\n"
+        if book_errors:
+            message += f"Could not check arbitrage with {', '.join(book_errors)} due to missing order book data.\n"
+
+        await ctx.send(message)
+
+    # 🚨 Arbitrage alerts, pushed to subscribed channels by the hub
+    @commands.group(invoke_without_command=True)
+    async def alert(self, ctx):
+        await ctx.send("Usage: `!alert add <spread %>`, `!alert remove [<spread %>]`, `!alert list`")
+
+    @alert.command(name="add")
+    @commands.has_permissions(manage_channels=True)
+    async def alert_add(self, ctx, threshold: Decimal):
+        try:
+            threshold = normalize_threshold(threshold)
+        except ValueError as e:
+            await ctx.send(f"❌ {e}")
+            return
+        await service.alert_add(ctx.channel.id, ctx.guild.id if ctx.guild else None, threshold, ctx.author.id)
+        await ctx.send(f"✅ This channel will be alerted when the CAW spread after fees exceeds {format_threshold(threshold)}%.")
+
+    @alert.command(name="remove")
+    @commands.has_permissions(manage_channels=True)
+    async def alert_remove(self, ctx, threshold: Decimal = None):
+        if threshold is not None:
+            try:
+                threshold = normalize_threshold(threshold)
+            except ValueError as e:
+                await ctx.send(f"❌ {e}")
+                return
+        removed = await service.alert_remove(ctx.channel.id, threshold)
+        await ctx.send(f"✅ Removed {removed} alert(s)." if removed else "❌ No matching alert in this channel.")
+
+    @alert.command(name="list")
+    async def alert_list(self, ctx):
+        thresholds = await service.alert_thresholds(ctx.channel.id)
+        if thresholds:
+            await ctx.send("**🚨 Alerts in this channel:** " + ", ".join(f"{format_threshold(threshold)}%" for threshold in thresholds))
+        else:
+            await ctx.send("No alerts in this channel.")
+
+    async def cog_command_error(self, ctx, error):
+        # Having this handler turns off discord.py's default logging for the whole cog, so every error ends here
+        if isinstance(error, commands.MissingPermissions):
+            await ctx.send("❌ Changing this channel's alerts needs the Manage Channels permission.")
+        elif isinstance(error, (commands.BadArgument, commands.MissingRequiredArgument)):
+            await ctx.send(f"Usage: `!{ctx.command.qualified_name} {ctx.command.signature}`")
+        else:
+            print(f"Command !{ctx.command.qualified_name if ctx.command else '?'} failed:")
+            traceback.print_exception(type(error), error, error.__traceback__)
+            await ctx.send("❌ Something went wrong, please try again later.")
+
+async def setup(bot):
+    await bot.add_cog(Exchange(bot))
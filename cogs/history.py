@@ -0,0 +1,64 @@
+from discord.ext import commands
+from rollups import history
+from ticks import best_spread_pct
+from hub import service
+from formatting import format_large_number
+from tracking import DEFAULT_SYMBOL
+
+# 📈 Sparkline characters, lowest to highest
+SPARKS = "▁▂▃▄▅▆▇█"
+
+class History(commands.Cog):
+    """Longer-range views: CDC rollups and the recorded cross-exchange spread."""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    # 📈 CDC total over the last <days> days in at most <points> rows, from the rollups
+    @commands.command()
+    async def cdc_history(self, ctx, days: int = 30, points: int = 15, symbol: str = DEFAULT_SYMBOL):
+        if days < 1 or not 1 <= points <= 25:
+            await ctx.send("❌ Usage: `!cdc_history <days> [points (1-25)] [token]`")
+            return
+
+        symbol = symbol.upper()
+        resolution, rows = await history(days, points, symbol)
+        if not rows:
+            await ctx.send(f"❌ No CDC {symbol} history for the last {days} days.")
+            return
+
+        lines = [
+            f"**📈 CDC Total {symbol}, last {days} days ({resolution} resolution):**",
+            "```",
+            "Period              | Min        | Max        | Last      ",
+            "-----------------------------------------------------------",
+        ]
+        for bucket, low, high, last in rows:  # At most 25, which stays under Discord's message size limit
+            lines.append(f"{str(bucket)[:19]:<19} | {format_large_number(low):<10} | {format_large_number(high):<10} | {format_large_number(last):<10}")
+        lines.append("```")
+        await ctx.send("\n".join(lines))
+
+    # 📈 Best cross-venue spread over the last <minutes>, from recorded ticks
+    @commands.command()
+    async def spread_history(self, ctx, minutes: int = 60):
+        if not 1 <= minutes <= 60 * 24 * 90:
+            await ctx.send("❌ Usage: `!spread_history [minutes (1-129600)]`")
+            return
+
+        slots = await service.spread_slots(minutes, 40)
+        spreads = [spread for spread in map(best_spread_pct, slots.values()) if spread is not None]
+        if not spreads:
+            await ctx.send(f"❌ No price ticks from two or more exchanges in the last {minutes} minutes.")
+            return
+
+        low, high = min(spreads), max(spreads)
+        scale = (high - low) or 1
+        sparkline = "".join(SPARKS[int((spread - low) / scale * (len(SPARKS) - 1))] for spread in spreads)
+        await ctx.send("\n".join([
+            f"**📈 Best CAW cross-exchange spread, last {minutes} min (before fees):**",
+            f"`{sparkline}`",
+            f"Min: {low:.2f}% | Avg: {sum(spreads) / len(spreads):.2f}% | Max: {high:.2f}% | Last: {spreads[-1]:.2f}%",
+        ]))
+
+async def setup(bot):
+    await bot.add_cog(History(bot))
@@ -0,0 +1,44 @@
+from discord.ext import commands
+from cmc import CMCError
+from hub import service
+from formatting import format_age, format_large_number, format_price
+
+def _stale_note(quote):
+    return f" ⚠️ *stale, CoinMarketCap is failing; last good quote from {format_age(quote.age)} ago*" if quote.stale else ""
+
+class Prices(commands.Cog):
+    """CoinMarketCap price and market cap lookups."""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def lookup_coin(self, ctx, symbol):
+        try:
+            quote = await service.coin_quote(symbol)
+        except CMCError as e:
+            await ctx.send(f"❌ CoinMarketCap error: {e}")
+            return None
+        if quote is None:
+            await ctx.send(f"❌ Unknown symbol: {symbol.upper()}")
+        return quote
+
+    # 💰 Crypto Price
+    @commands.command()
+    async def price(self, ctx, symbol: str):
+        quote = await self.lookup_coin(ctx, symbol)
+        if quote and quote.price is not None:
+            await ctx.send(f"💰 **{quote.name} ({quote.symbol}):** {format_price(quote.price)}{_stale_note(quote)}")
+        elif quote:
+            await ctx.send(f"❌ No price reported for {quote.symbol}")
+
+    # 💰 Crypto Market Cap
+    @commands.command()
+    async def mc(self, ctx, symbol: str):
+        quote = await self.lookup_coin(ctx, symbol)
+        if quote and quote.market_cap:
+            await ctx.send(f"💰 **{quote.name} ({quote.symbol}) Market Cap:** ${format_large_number(quote.market_cap)}{_stale_note(quote)}")
+        elif quote:
+            await ctx.send(f"❌ No market cap reported for {quote.symbol}")
+
+async def setup(bot):
+    await bot.add_cog(Prices(bot))
@@ -0,0 +1,182 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from functools import reduce
+from discord.ext import commands
+import db
+import tracking
+from amounts import EXACT
+from hub import service
+from tracking import BURN_GROUP, CDC_GROUP, DEFAULT_SYMBOL
+from formatting import format_age, format_balance, format_change, format_large_number
+
+def _group_title(group):
+    return group.upper() if len(group) <= 4 else group.title()
+
+def _snapshots(rows):
+    """{ts: {address: amount}} from (ts, wallet, amount) rows, in row order."""
+    snapshots = {}
+    for ts, wallet, amount in rows:
+        snapshots.setdefault(ts, {})[wallet] = amount
+    return snapshots
+
+def _total(balances, wallets):
+    """Sum over `wallets`, or None if any of them has no recorded balance."""
+    amounts = [balances.get(wallet.address) for wallet in wallets]
+    return None if None in amounts else reduce(EXACT.add, amounts, Decimal(0))
+
+class Wallets(commands.Cog):
+    """Tracked wallet balances: the latest snapshot, comparisons between recorded snapshots and transfer flows."""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    # 📌 Wallet Balances: latest background snapshot, or a live fetch with `!cdc fresh`; CAW unless a token is given
+    @commands.command()
+    async def cdc(self, ctx, *options: str):
+        fresh = "fresh" in options
+        symbol = next((option for option in options if option != "fresh"), DEFAULT_SYMBOL)
+        snapshot = await service.snapshot(symbol, fresh=fresh)
+
+        if snapshot is None:
+            await ctx.send(f"❌ {symbol.upper()} is not a tracked token.")
+            return
+        if all(balance is None for balance in snapshot.balances.values()):
+            await ctx.send("❌ Unable to fetch balances!")
+            return
+
+        symbol = snapshot.token.symbol
+        groups = list(dict.fromkeys(wallet.group for wallet in snapshot.wallets))
+        sections = []
+        for group in [group for group in groups if group != BURN_GROUP]:
+            title = _group_title(group)
+            lines = [f"**📊 {title} Wallet Balances ({symbol}):**"]
+            lines += [f"- **{wallet.title}:** {format_balance(balance)} {symbol}" for wallet, balance in snapshot.group(group)]
+            total = snapshot.total(group)
+            if total is not None:
+                lines.append(f"\n**Total {title} Holdings: {format_large_number(total)} {symbol}**")
+                lines.append(f"**Percentage of Total Supply: {snapshot.supply_percentage(group):.4f}%**")
+            else:
+                lines.append(f"\n**Total {title} Holdings: unknown** (some balances could not be fetched, not saved)")
+            sections.append("\n".join(lines))
+
+        # Show Burn wallets separately
+        burn = [f"🔥 **{wallet.title}: {format_balance(balance)} {symbol}** 🔥" for wallet, balance in snapshot.group(BURN_GROUP)]
+        if burn:
+            sections.append("\n".join(burn))
+        sections.append(f"*As of {snapshot.taken_at:%Y-%m-%d %H:%M} UTC*")
+        if snapshot.stale:
+            sections.append(f"⚠️ **Stale:** balances could not be fetched, this is the last complete snapshot "
+                            f"({format_age(snapshot.age)} old).")
+        await ctx.send("\n\n".join(sections))
+
+    # 📊 Compare the latest CDC balances with the snapshot `entries_back` entries earlier
+    @commands.command()
+    async def compare_cdc(self, ctx, entries_back: int = 1, symbol: str = DEFAULT_SYMBOL):
+        if entries_back < 1:
+            await ctx.send("❌ Number of entries back must be at least 1.")
+            return
+
+        symbol = symbol.upper()
+        rows = await db.fetch("select_balances_compare", symbol, symbol, symbol, entries_back)
+        snapshots = _snapshots(sorted(rows, key=lambda row: row[0], reverse=True))
+        if len(snapshots) < 2:
+            await ctx.send(f"❌ Not enough {symbol} records to compare {entries_back} entries back.")
+            return
+
+        (latest_at, latest), (previous_at, previous) = snapshots.items()
+        wallets = (await tracking.current()).group(CDC_GROUP)
+        lines = [f"**📊 CDC Wallet Comparison, {symbol} ({latest_at:%Y-%m-%d %H:%M} vs {previous_at:%Y-%m-%d %H:%M}, "
+                 f"{entries_back} entries back):**"]
+        rows = [(wallet.title, latest.get(wallet.address), previous.get(wallet.address)) for wallet in wallets]
+        rows.append(("Sum", _total(latest, wallets), _total(previous, wallets)))
+        for title, value, before in rows:
+            if value is None or before is None:
+                lines.append(f"- **{title}:** {format_balance(value)} (no earlier record)")
+                continue
+            delta = value - before
+            lines.append(f"- **{title}:** {format_large_number(value)} ({format_change(delta, delta * 100 / before if before else None)})")
+        await ctx.send("\n".join(lines))
+
+    # 📊 Compare CDC Wallets
+    @commands.command()
+    async def compare_cdc_last10(self, ctx, symbol: str = DEFAULT_SYMBOL):
+        symbol = symbol.upper()
+        snapshots = _snapshots(await db.fetch("select_latest_balances", symbol, symbol, 10))
+        wallets = (await tracking.current()).group(CDC_GROUP)
+
+        header = f"{'Time':<16} | " + " | ".join(f"{wallet.title:<9}" for wallet in wallets) + f" | {'Sum':<9}"
+        lines = [f"**📊 Last 10 CDC Wallet Records ({symbol}):**", "```", header, "-" * len(header)]
+        for ts, balances in snapshots.items():
+            columns = [balances.get(wallet.address) for wallet in wallets] + [_total(balances, wallets)]
+            lines.append(f"{ts:%Y-%m-%d %H:%M} | " + " | ".join(f"{format_balance(value):<9}" for value in columns))
+        lines.append("```")
+
+        await ctx.send("\n".join(lines))
+
+    # 🔁 Tokens flowing in and out of each wallet over the last <days> days, from the transfer index
+    @commands.command()
+    async def cdc_flow(self, ctx, days: int = 7, symbol: str = DEFAULT_SYMBOL):
+        if not 1 <= days <= 3650:
+            await ctx.send("❌ Usage: `!cdc_flow [days (1-3650)] [token]`")
+            return
+
+        symbol = symbol.upper()
+        since = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days)
+        flows = {wallet: row for wallet, *row in await db.fetch("select_token_flows", symbol, since)}
+        if not flows:
+            await ctx.send(f"❌ No indexed {symbol} transfers in the last {days} days.")
+            return
+
+        lines = [f"**🔁 {symbol} Flows, last {days} days:**"]
+        cdc_net = 0
+        for wallet in (await tracking.current()).wallets:
+            inflow, outflow, net, count = flows.get(wallet.address, (0, 0, 0, 0))
+            if wallet.group == CDC_GROUP:
+                cdc_net += net
+            lines.append(f"- **{wallet.title}:** in {format_large_number(inflow)}, out {format_large_number(outflow)}, "
+                         f"net {'+' if net >= 0 else '-'}{format_large_number(abs(net))} ({count} transfers)")
+        lines.append(f"\n**Net flow into CDC wallets: {'+' if cdc_net >= 0 else '-'}{format_large_number(abs(cdc_net))} {symbol}**")
+        await ctx.send("\n".join(lines))
+
+    # 🛠️ Tracked tokens and wallets (bot owner only); every process picks edits up without a restart
+    @commands.group(invoke_without_command=True)
+    @commands.is_owner()
+    async def track(self, ctx):
+        current = await tracking.current()
+        lines = ["**🛠️ Tracked tokens:**"]
+        lines += [f"- **{token.symbol}** `{token.contract}` ({token.decimals} decimals, supply {format_large_number(token.total_supply)})"
+                  for token in current.tokens]
+        lines.append("**🛠️ Tracked wallets:**")
+        lines += [f"- **{wallet.title}** ({wallet.group}) `{wallet.address}`" for wallet in current.wallets]
+        lines.append("Usage: `!track token <symbol> <contract> <decimals> <supply> [start block]`, "
+                     "`!track wallet <address> <group> <title>`, `!track remove <symbol or address>`")
+        await ctx.send("\n".join(lines))
+
+    @track.command(name="token")
+    @commands.is_owner()
+    async def track_token(self, ctx, symbol: str, contract: str, decimals: int, total_supply: int, start_block: int = 0):
+        try:
+            await tracking.track_token(symbol, contract, decimals, total_supply, start_block)
+        except ValueError as e:
+            await ctx.send(f"❌ {e}")
+            return
+        await ctx.send(f"✅ Tracking {symbol.upper()}.")
+
+    @track.command(name="wallet")
+    @commands.is_owner()
+    async def track_wallet(self, ctx, address: str, group: str, *, title: str):
+        try:
+            await tracking.track_wallet(address, group, title)
+        except ValueError as e:
+            await ctx.send(f"❌ {e}")
+            return
+        await ctx.send(f"✅ Tracking {title} in {group.lower()}.")
+
+    @track.command(name="remove")
+    @commands.is_owner()
+    async def track_remove(self, ctx, key: str):
+        removed = await tracking.untrack(key)
+        await ctx.send(f"✅ Stopped tracking {key}." if removed else f"❌ {key} is not tracked.")
+
+async def setup(bot):
+    await bot.add_cog(Wallets(bot))
@@ -1,126 +1,83 @@
-import requests
+import argparse
+import asyncio
 import json
-
-def get_gateio_caw_data():
-    """Retrieves the ask and bid price of CAW/USDT from Gate.io with 11 decimal places."""
-    base_url = "https://api.gateio.ws/api/v4"
-    currency_pair = "CAW_USDT"
-
-    try:
-        ticker_endpoint = f"{base_url}/spot/tickers?currency_pair={currency_pair}"
-        response = requests.get(ticker_endpoint)
-        response.raise_for_status()
-        data = response.json()
-
-        if data and isinstance(data, list) and len(data) > 0:
-            ticker_info = data[0]
-            ask = ticker_info.get('lowest_ask')
-            bid = ticker_info.get('highest_bid')
-            return {"exchange": "Gate.io", "ask": f"{float(ask):.11f}" if ask else None, "bid": f"{float(bid):.11f}" if bid else None}
-        else:
-            return {"exchange": "Gate.io", "error": f"Could not retrieve ticker data for {currency_pair}"}
-
-    except requests.exceptions.RequestException as e:
-        return {"exchange": "Gate.io", "error": f"API request error: {e}"}
-    except json.JSONDecodeError as e:
-        return {"exchange": "Gate.io", "error": f"JSON decoding error: {e}"}
-    except Exception as e:
-        return {"exchange": "Gate.io", "error": f"An unexpected error occurred: {e}"}
-
-def get_ascendex_caw_data():
-    """Retrieves the ask and bid price of CAW/USDT from AscendEx with 11 decimal places."""
-    base_url = "https://ascendex.com/api/pro/v1"
-    symbol = "$CAW/USDT"  # Corrected symbol
-
+import os
+from decimal import Decimal
+from config import TAKER_FEES
+from exchanges import VENUES, fetch_books, fetch_quotes
+from arbitrage import arbitrage_matrix, size_opportunities
+from upstream import close_session
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def load_fixtures(fixtures_dir, kind):
+    """Parses recorded `<adapter key>_<kind>.json` responses (ticker or depth) instead of calling the exchanges."""
+    results, errors = {}, {}
+    for adapter in VENUES:
+        try:
+            with open(os.path.join(fixtures_dir, f"{adapter.key}_{kind}.json")) as f:
+                data = json.load(f, parse_float=Decimal)
+            results[adapter.name] = adapter.parse_ticker(data) if kind == "ticker" else adapter.parse_depth(data)
+        except (OSError, ValueError) as e:
+            errors[adapter.name] = str(e)
+    return results, errors
+
+async def fetch_live():
     try:
-        ticker_endpoint = f"{base_url}/spot/ticker?symbol={symbol}"
-        response = requests.get(ticker_endpoint)
-        response.raise_for_status()
-        data = response.json()
-
-        if data and 'data' in data and isinstance(data['data'], dict):
-            ticker_info = data['data']
-            ask = ticker_info.get('ask')
-            bid = ticker_info.get('bid')
-            return {"exchange": "AscendEx", "ask": f"{float(ask[0]):.11f}" if ask else None, "bid": f"{float(bid[0]):.11f}" if bid else None}
-        else:
-            return {"exchange": "AscendEx", "error": f"Could not retrieve ticker data for {symbol}"}
-
-    except requests.exceptions.RequestException as e:
-        return {"exchange": "AscendEx", "error": f"API request error: {e}"}
-    except json.JSONDecodeError as e:
-        return {"exchange": "AscendEx", "error": f"JSON decoding error: {e}"}
-    except Exception as e:
-        return {"exchange": "AscendEx", "error": f"An unexpected error occurred: {e}"}
+        return await asyncio.gather(fetch_quotes(), fetch_books())
+    finally:
+        await close_session()
 
 if __name__ == "__main__":
-    gateio_data = get_gateio_caw_data()
-    ascendex_data = get_ascendex_caw_data()
+    parser = argparse.ArgumentParser(description="Compare CAW/USDT ask and bid across exchanges.")
+    parser.add_argument("--fixtures", nargs="?", const=FIXTURES_DIR, help="read recorded responses from this directory instead of the network")
+    args = parser.parse_args()
 
-    print("--- CAW/USDT Ask and Bid Comparison ---")
-    print("---------------------------------------")
-
-    # Print Gate.io Results
-    print("Gate.io:")
-    if "error" in gateio_data:
-        print(f"  Error: {gateio_data['error']}")
-        gateio_buy_price = None
-        gateio_sell_price = None
+    if args.fixtures:
+        (quotes, errors), (books, book_errors) = load_fixtures(args.fixtures, "ticker"), load_fixtures(args.fixtures, "depth")
     else:
-        gateio_sell_price = gateio_data['ask']
-        gateio_buy_price = gateio_data['bid']
-        print(f"  Selling Price (Ask): {gateio_sell_price}")
-        print(f"  Buying Price (Bid): {gateio_buy_price}")
-    print("---------------------------------------")
+        (quotes, errors), (books, book_errors) = asyncio.run(fetch_live())
 
-    # Print AscendEx Results
-    print("AscendEx:")
-    if "error" in ascendex_data:
-        print(f"  Error: {ascendex_data['error']}")
-        ascendex_buy_price = None
-        ascendex_sell_price = None
-    else:
-        ascendex_sell_price = ascendex_data['ask']
-        ascendex_buy_price = ascendex_data['bid']
-        print(f"  Selling Price (Ask): {ascendex_sell_price}")
-        print(f"  Buying Price (Bid): {ascendex_buy_price}")
+    print("--- CAW/USDT Ask and Bid Comparison ---")
     print("---------------------------------------")
 
+    for adapter in VENUES:
+        print(f"{adapter.name}:")
+        if adapter.name in quotes:
+            quote = quotes[adapter.name]
+            print(f"  Selling Price (Ask): {quote.ask:.11f}")
+            print(f"  Buying Price (Bid): {quote.bid:.11f}")
+        else:
+            print(f"  Error: {errors.get(adapter.name)}")
+        print("---------------------------------------")
+
     # Comparison and Potential Arbitrage
     print("\n--- Potential Arbitrage Opportunity (if available) ---")
     arbitrage_amount = 2000000000  # 2 billion CAW tokens
 
-    if gateio_buy_price and ascendex_sell_price:
-        gateio_buy_price_float = float(gateio_buy_price)
-        ascendex_sell_price_float = float(ascendex_sell_price)
-        if gateio_buy_price_float < ascendex_sell_price_float:
-            cost_gateio = arbitrage_amount * gateio_buy_price_float
-            revenue_ascendex = arbitrage_amount * ascendex_sell_price_float
-            profit = revenue_ascendex - cost_gateio
-            print("Buy on Gate.io, sell on AscendEx:")
-            print(f"  Buy Price on Gate.io: {gateio_buy_price}")
-            print(f"  Sell Price on AscendEx: {ascendex_sell_price}")
-            print(f"  Cost to buy {arbitrage_amount} CAW on Gate.io: {cost_gateio:.8f} USDT")
-            print(f"  Revenue from selling {arbitrage_amount} CAW on AscendEx: {revenue_ascendex:.8f} USDT")
-            print(f"  Potential Profit (without fees): {profit:.8f} USDT")
-        else:
-            print("No direct arbitrage opportunity (Buy Gate.io < Sell AscendEx) at this moment.")
-
-    if ascendex_buy_price and gateio_sell_price:
-        ascendex_buy_price_float = float(ascendex_buy_price)
-        gateio_sell_price_float = float(gateio_sell_price)
-        if ascendex_buy_price_float < gateio_sell_price_float:
-            cost_ascendex = arbitrage_amount * ascendex_buy_price_float
-            revenue_gateio = arbitrage_amount * gateio_sell_price_float
-            profit = revenue_gateio - cost_ascendex
-            print("\nBuy on AscendEx, sell on Gate.io:")
-            print(f"  Buy Price on AscendEx: {ascendex_buy_price}")
-            print(f"  Sell Price on Gate.io: {gateio_sell_price}")
-            print(f"  Cost to buy {arbitrage_amount} CAW on AscendEx: {cost_ascendex:.8f} USDT")
-            print(f"  Revenue from selling {arbitrage_amount} CAW on Gate.io: {revenue_gateio:.8f} USDT")
-            print(f"  Potential Profit (without fees): {profit:.8f} USDT")
+    for opportunity in arbitrage_matrix(quotes):
+        if opportunity.profitable:
+            print(f"\nBuy on {opportunity.buy_exchange}, sell on {opportunity.sell_exchange}:")
+            print(f"  Buy Price on {opportunity.buy_exchange}: {opportunity.buy_price:.11f}")
+            print(f"  Sell Price on {opportunity.sell_exchange}: {opportunity.sell_price:.11f}")
+            print(f"  Cost to buy {arbitrage_amount} CAW on {opportunity.buy_exchange}: {arbitrage_amount * opportunity.buy_price:.8f} USDT")
+            print(f"  Revenue from selling {arbitrage_amount} CAW on {opportunity.sell_exchange}: {arbitrage_amount * opportunity.sell_price:.8f} USDT")
+            print(f"  Potential Profit (without fees): {opportunity.profit(arbitrage_amount):.8f} USDT")
         else:
-            print("No direct arbitrage opportunity (Buy AscendEx < Sell Gate.io) at this moment.")
+            print(f"No direct arbitrage opportunity (Buy {opportunity.buy_exchange} < Sell {opportunity.sell_exchange}) at this moment.")
 
-    if not gateio_buy_price or not ascendex_sell_price or not ascendex_buy_price or not gateio_sell_price:
+    if errors:
         print("Could not perform arbitrage calculation due to missing price data.")
+
+    print("\n--- Depth-Aware Arbitrage (after taker fees) ---")
+    for opportunity in size_opportunities(books, TAKER_FEES):
+        if opportunity.size:
+            print(f"\nBuy on {opportunity.buy_exchange}, sell on {opportunity.sell_exchange}:")
+            print(f"  Max profitable size: {opportunity.size:.0f} CAW")
+            print(f"  Avg Buy Price: {opportunity.buy_vwap:.11f}, Avg Sell Price: {opportunity.sell_vwap:.11f}")
+            print(f"  Cost: {opportunity.cost:.8f} USDT, Revenue: {opportunity.revenue:.8f} USDT")
+            print(f"  Net Profit: {opportunity.profit:.8f} USDT")
+        else:
+            print(f"No profitable size (Buy {opportunity.buy_exchange} -> Sell {opportunity.sell_exchange}) after fees.")
+    if book_errors:
+        print(f"Missing order books: {', '.join(book_errors)}")
@@ -1,12 +1,137 @@
 import os
+from decimal import Decimal
 
-# Contract Address for CAW
-CAW_CONTRACT_ADDRESS = "0xcCcCcCcCdbEC186DC426F8B5628AF94737dF0E60"
+# Tracked tokens and wallets, seeded into the tracked_tokens / tracked_wallets tables on first start.
+# After that the tables are the source of truth (edit them or use `!track`); changes are picked up
+# within TRACKING_RELOAD_INTERVAL seconds without a restart.
+# (symbol, contract, decimals, total supply in whole tokens, first block the transfer indexer reads)
+DEFAULT_TOKENS = [
+    ("CAW", "0xcCcCcCcCdbEC186DC426F8B5628AF94737dF0E60", 18, 777_777_777_777_777, int(os.getenv("TRANSFER_START_BLOCK", "0"))),
+]
+# (address, wallet group, title), in display order; every wallet is tracked for every token
+DEFAULT_WALLETS = [
+    ("0x25aA97464F38a1506a16160bbc03cfC6DD863da3", "cdc", "3DA3"),
+    ("0x069E536d2429172e402A8c0DDCE822FC60a3677f", "cdc", "677F"),
+    ("0x8995909DC0960FC9c75B6031D683124a4016825b", "cdc", "825B"),
+    ("0x000000000000000000000000000000000000dead", "burn", "Burn"),
+]
+TRACKING_RELOAD_INTERVAL = float(os.getenv("TRACKING_RELOAD_INTERVAL", "60"))
+
+# HTTP timeouts (seconds) for upstream exchange APIs
+EXCHANGE_TIMEOUT = float(os.getenv("EXCHANGE_TIMEOUT", "5"))  # Per exchange request
+EXCHANGE_DEADLINE = float(os.getenv("EXCHANGE_DEADLINE", "8"))  # Whole `!ex` fetch
 
-# Wallet Addresses for CAW
-CAW_ADDRESSES = [
-    "0x25aA97464F38a1506a16160bbc03cfC6DD863da3",
-    "0x069E536d2429172e402A8c0DDCE822FC60a3677f",
-    "0x8995909DC0960FC9c75B6031D683124a4016825b",
-    "0x000000000000000000000000000000000000dead",
+# Exchange venues for CAW/USDT: (adapter key, exchange symbol), in display order
+EXCHANGE_VENUES = [
+    ("gateio", "CAW_USDT"),
+    ("ascendex", "$CAW/USDT"),
+    ("cryptocom", "CAW_USDT"),
 ]
+
+# Order book levels fetched per side, and taker fee per venue (fraction of notional)
+ORDER_BOOK_DEPTH = int(os.getenv("ORDER_BOOK_DEPTH", "50"))
+TAKER_FEES = {
+    "Gate.io": Decimal(os.getenv("GATEIO_TAKER_FEE", "0.002")),
+    "AscendEx": Decimal(os.getenv("ASCENDEX_TAKER_FEE", "0.001")),
+    "Crypto.com": Decimal(os.getenv("CRYPTOCOM_TAKER_FEE", "0.0025")),
+}
+# Fee assumed for a venue missing from TAKER_FEES: on the expensive side, so a new venue never looks free
+DEFAULT_TAKER_FEE = Decimal(os.getenv("DEFAULT_TAKER_FEE", "0.005"))
+
+# Quote cache TTLs (seconds) per upstream source, and max cached symbols per source
+CACHE_TTLS = {
+    "exchange": float(os.getenv("EXCHANGE_CACHE_TTL", "5")),
+    "cmc": float(os.getenv("CMC_CACHE_TTL", "60")),
+    "cmc_missing": float(os.getenv("CMC_MISSING_TTL", "300")),  # Symbols CoinMarketCap didn't know
+    "depth": float(os.getenv("DEPTH_CACHE_TTL", "5")),
+}
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "512"))
+
+# CoinMarketCap: lookups arriving within CMC_BATCH_WINDOW seconds share one quotes/latest call
+CMC_TIMEOUT = float(os.getenv("CMC_TIMEOUT", "10"))
+CMC_BATCH_WINDOW = float(os.getenv("CMC_BATCH_WINDOW", "0.05"))
+CMC_BATCH_MAX = 100  # Symbols per quotes/latest call
+CMC_INDEX_REFRESH = float(os.getenv("CMC_INDEX_REFRESH", str(24 * 3600)))  # Symbol -> id index refresh
+
+# Balances are read with balanceOf calls, up to RPC_BATCH_MAX per JSON-RPC batch request to the Cronos node
+CRONOS_RPC_URL = os.getenv("CRONOS_RPC_URL", "https://evm.cronos.org")
+RPC_BATCH_MAX = int(os.getenv("RPC_BATCH_MAX", "100"))
+
+# Cronoscan tokenbalance fallback when a batch fails: parallel requests, per-address timeout and retries on rate limiting
+BALANCE_CONCURRENCY = int(os.getenv("BALANCE_CONCURRENCY", "5"))
+BALANCE_TIMEOUT = float(os.getenv("BALANCE_TIMEOUT", "10"))
+BALANCE_RETRIES = int(os.getenv("BALANCE_RETRIES", "3"))
+BALANCE_BACKOFF = float(os.getenv("BALANCE_BACKOFF", "1"))  # Seconds, doubled on every retry
+
+# PostgreSQL connection pool size (DATABASE_URL may also be sqlite:///path for local runs).
+# psycopg2 closes returned connections beyond DB_POOL_MIN, so it defaults to DB_POOL_MAX to keep them warm
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "5"))
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", str(DB_POOL_MAX)))
+
+# Background CDC balance snapshots: one row per interval bucket (seconds)
+CDC_SNAPSHOT_INTERVAL = int(os.getenv("CDC_SNAPSHOT_INTERVAL", "3600"))
+
+# Transfer indexer: follows Cronoscan tokentx for every tracked token and wallet from the token's start block
+# on and keeps balances and in/outflows in the DB, so snapshots only fetch balances it hasn't caught up on
+TRANSFER_INDEXING = os.getenv("TRANSFER_INDEXING", "1") == "1"
+TRANSFER_PAGE_SIZE = int(os.getenv("TRANSFER_PAGE_SIZE", "1000"))
+TRANSFER_POLL_INTERVAL = float(os.getenv("TRANSFER_POLL_INTERVAL", "60"))
+TRANSFER_MAX_LAG = float(os.getenv("TRANSFER_MAX_LAG", "600"))  # Seconds before snapshots fetch a balance directly again
+
+# Streaming market data: keep a live best bid/ask per venue from WebSocket feeds and answer `!ex` from memory
+EXCHANGE_STREAMING = os.getenv("EXCHANGE_STREAMING", "0") == "1"
+EXCHANGE_STREAM_MAX_AGE = float(os.getenv("EXCHANGE_STREAM_MAX_AGE", "60"))  # Older quotes count as missing
+EXCHANGE_STREAM_MAX_BACKOFF = float(os.getenv("EXCHANGE_STREAM_MAX_BACKOFF", "60"))  # Reconnect delay cap
+DEPTH_REFRESH_INTERVAL = float(os.getenv("DEPTH_REFRESH_INTERVAL", "10"))  # Background order book sizing while streaming
+EXCHANGE_WS_OVERRIDE = os.getenv("EXCHANGE_WS_OVERRIDE")  # e.g. ws://127.0.0.1:8765/ws for mock_upstreams.py
+
+# Send every REST call to https://<host>/<path> to UPSTREAM_HTTP_OVERRIDE/<host>/<path> instead,
+# e.g. http://127.0.0.1:8765/http for mock_upstreams.py
+UPSTREAM_HTTP_OVERRIDE = os.getenv("UPSTREAM_HTTP_OVERRIDE")
+
+# Arbitrage alerts: re-arm once the spread falls HYSTERESIS percentage points below a threshold,
+# and never alert the same subscription more than once per COOLDOWN seconds
+ALERT_HYSTERESIS = Decimal(os.getenv("ALERT_HYSTERESIS", "0.2"))
+ALERT_COOLDOWN = float(os.getenv("ALERT_COOLDOWN", "900"))
+ALERT_POLL_INTERVAL = float(os.getenv("ALERT_POLL_INTERVAL", "30"))  # REST polling when not streaming
+
+# Price tick history: in-memory ring buffer per venue, flushed to price_ticks in batches
+TICK_BUFFER_SIZE = int(os.getenv("TICK_BUFFER_SIZE", "4096"))  # Ticks kept per venue
+TICK_FLUSH_INTERVAL = float(os.getenv("TICK_FLUSH_INTERVAL", "60"))
+
+# Metrics: Prometheus text format at http://METRICS_HOST:METRICS_PORT/metrics (port 0 turns it off)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+
+# Sharding: SHARD_COUNT gateway shards (0 = unsharded) spread over SHARD_PROCESSES processes.
+# With more than one process, discord_bot_price.py starts a hub process that owns every upstream
+# poller, plus one process per group of shards that asks the hub for data (BOT_ROLE is set for them)
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0"))
+SHARD_PROCESSES = int(os.getenv("SHARD_PROCESSES", "1"))
+SHARD_IDS = [int(shard) for shard in os.getenv("SHARD_IDS", "").split(",") if shard]  # Shards run by this process
+BOT_ROLE = os.getenv("BOT_ROLE", "standalone")  # standalone | hub | shard
+HUB_ADDRESS = (os.getenv("HUB_HOST", "127.0.0.1"), int(os.getenv("HUB_PORT", "8790")))
+HUB_AUTHKEY = os.getenv("HUB_AUTHKEY", "").encode()  # Generated by the launcher when unset; required by the hub and shard roles
+HUB_CALL_TIMEOUT = float(os.getenv("HUB_CALL_TIMEOUT", "30"))
+MATH_PROCESSES = int(os.getenv("MATH_PROCESSES", "0"))  # Process pool for order book math; 0 runs it inline
+
+# Circuit breakers: after BREAKER_FAILURES consecutive timeouts, connection errors or 5xx from one API,
+# calls to it fail fast for BREAKER_COOLDOWN seconds, then a single probe call decides whether it is back.
+# Meanwhile commands show the last good value they have, if it is at most STALE_MAX_AGE seconds old
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "30"))
+STALE_MAX_AGE = float(os.getenv("STALE_MAX_AGE", "3600"))
+
+# Upstream rate limits as "requests per second,burst", shaped to each API's published limit.
+# User commands are served before background pollers when a bucket runs dry
+RATE_LIMITS = {
+    api: tuple(float(part) for part in os.getenv(f"RATE_LIMIT_{api.upper()}", default).split(","))
+    for api, default in {
+        "gateio": "10,20",  # 200 requests / 10 s per public endpoint
+        "ascendex": "20,20",  # 100 requests / s per IP
+        "cryptocom": "20,20",  # 100 requests / s per public endpoint
+        "cronoscan": "5,5",  # Free tier: 5 calls / s
+        "cronosrpc": "10,10",  # Public node; a batch request counts once
+        "cmc": "0.5,5",  # Basic plan: 30 calls / minute
+    }.items()
+}
@@ -0,0 +1,492 @@
+import asyncio
+import queue
+import re
+import sqlite3
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from config import DB_POOL_MIN, DB_POOL_MAX
+from metrics import timed
+
+# 📌 Named queries, written once with %s placeholders.
+# On PostgreSQL each one is PREPAREd once per pooled connection and run with EXECUTE.
+QUERIES = {
+    # Tracked tokens and wallets (see tracking.py)
+    "select_tracked_tokens": "SELECT symbol, contract, decimals, total_supply, start_block FROM tracked_tokens ORDER BY symbol",
+    "select_tracked_wallets": "SELECT address, wallet_group, title FROM tracked_wallets ORDER BY position, address",
+    "upsert_tracked_token": """
+        INSERT INTO tracked_tokens (symbol, contract, decimals, total_supply, start_block)
+        VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT (symbol) DO UPDATE SET
+            contract = EXCLUDED.contract, decimals = EXCLUDED.decimals,
+            total_supply = EXCLUDED.total_supply, start_block = EXCLUDED.start_block
+    """,
+    # New wallets go after the existing ones; re-adding one keeps its place
+    "upsert_tracked_wallet": """
+        INSERT INTO tracked_wallets (address, wallet_group, title, position)
+        VALUES (%s, %s, %s, (SELECT COALESCE(MAX(position) + 1, 0) FROM tracked_wallets))
+        ON CONFLICT (address) DO UPDATE SET wallet_group = EXCLUDED.wallet_group, title = EXCLUDED.title
+    """,
+    "delete_tracked_token": "DELETE FROM tracked_tokens WHERE symbol = %s",
+    "delete_tracked_wallet": "DELETE FROM tracked_wallets WHERE address = %s",
+    # Set once the defaults were seeded (or tracking was already in use), so emptying the tables never re-seeds them
+    "count_tracking_seeded": "SELECT COUNT(*) FROM tracking_seeded",
+    "insert_tracking_seeded": "INSERT INTO tracking_seeded (id, seeded_at) VALUES (1, %s) ON CONFLICT (id) DO NOTHING",
+    # One row per (token, wallet, snapshot bucket); a re-run inside the same bucket overwrites it
+    "upsert_wallet_balance": """
+        INSERT INTO wallet_balances (ts, token, wallet, amount)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (token, wallet, ts) DO UPDATE SET amount = EXCLUDED.amount
+    """,
+    "exists_wallet_balances": "SELECT EXISTS (SELECT 1 FROM wallet_balances)",
+    # Every balance of the latest `limit` snapshots of a token, newest first
+    "select_latest_balances": """
+        SELECT ts, wallet, amount FROM wallet_balances
+        WHERE token = %s AND ts IN (SELECT DISTINCT ts FROM wallet_balances WHERE token = %s ORDER BY ts DESC LIMIT %s)
+        ORDER BY ts DESC
+    """,
+    # Balances of a token's latest snapshot and of the one `offset` snapshots earlier, both walked from (token, ts)
+    "select_balances_compare": """
+        SELECT ts, wallet, amount FROM wallet_balances
+        WHERE token = %s AND ts IN (
+            (SELECT DISTINCT ts FROM wallet_balances WHERE token = %s ORDER BY ts DESC LIMIT 1),
+            (SELECT DISTINCT ts FROM wallet_balances WHERE token = %s ORDER BY ts DESC LIMIT 1 OFFSET %s)
+        )
+    """,
+    # Group totals for ranges finer than a day, downsampled to (first ts, min, max, last) per `slot_seconds` from `since`
+    "select_group_balance_slots": """
+        WITH slots AS (
+            SELECT FLOOR(EXTRACT(EPOCH FROM b.ts - %s::timestamp) / %s) AS slot, b.ts, SUM(b.amount) AS total FROM wallet_balances b
+            JOIN tracked_wallets w ON w.address = b.wallet
+            WHERE b.token = %s AND w.wallet_group = %s AND b.ts >= %s
+            GROUP BY b.ts
+        )
+        SELECT MIN(ts), MIN(total), MAX(total), (ARRAY_AGG(total ORDER BY ts DESC))[1]
+        FROM slots GROUP BY slot ORDER BY slot
+    """,
+    "select_wallet_balances_all": "SELECT ts, token, wallet, amount FROM wallet_balances ORDER BY ts",
+    # Complete rows of the old one-column-per-wallet table, copied into wallet_balances once
+    "select_caw_cdc_legacy": """
+        SELECT COALESCE(bucket, date), wallet_3da3, wallet_667, wallet_825b, burn FROM caw_cdc
+        WHERE sum IS NOT NULL
+    """,
+    # Fold one observation into a day/week/month rollup bucket; `wallet` is an address or a wallet group's total
+    "upsert_balance_rollup": """
+        INSERT INTO balance_rollup AS r (resolution, token, wallet, bucket, min, max, last, last_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (resolution, token, wallet, bucket) DO UPDATE SET
+            min = LEAST(r.min, EXCLUDED.min),
+            max = GREATEST(r.max, EXCLUDED.max),
+            last = CASE WHEN EXCLUDED.last_at >= r.last_at THEN EXCLUDED.last ELSE r.last END,
+            last_at = GREATEST(r.last_at, EXCLUDED.last_at)
+    """,
+    "select_balance_rollup": """
+        SELECT bucket, min, max, last FROM balance_rollup
+        WHERE resolution = %s AND token = %s AND wallet = %s AND bucket >= %s
+        ORDER BY bucket
+    """,
+    "count_balance_rollup": "SELECT COUNT(*) FROM balance_rollup",
+    # Transfer index: one row per tracked (token, wallet) with its block cursor and running totals
+    "select_token_wallet_index": "SELECT token, wallet, cursor_block, balance, inflow, outflow FROM token_wallet_index",
+    "upsert_token_wallet_index": """
+        INSERT INTO token_wallet_index (token, wallet, cursor_block, balance, inflow, outflow, updated_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (token, wallet) DO UPDATE SET
+            cursor_block = EXCLUDED.cursor_block, balance = EXCLUDED.balance,
+            inflow = EXCLUDED.inflow, outflow = EXCLUDED.outflow, updated_at = EXCLUDED.updated_at
+    """,
+    # Signed amount: positive into `wallet`, negative out of it
+    "insert_token_transfer": """
+        INSERT INTO token_transfers (token, wallet, block, ts, tx_hash, counterparty, amount)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+    """,
+    "select_token_flows": """
+        SELECT wallet,
+               SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END),
+               SUM(CASE WHEN amount < 0 THEN -amount ELSE 0 END),
+               SUM(amount), COUNT(*)
+        FROM token_transfers WHERE token = %s AND ts >= %s
+        GROUP BY wallet
+    """,
+    "insert_arb_alert": """
+        INSERT INTO arb_alerts (channel_id, guild_id, threshold, created_by, created_at)
+        VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT (channel_id, threshold) DO NOTHING
+    """,
+    "delete_arb_alert": "DELETE FROM arb_alerts WHERE channel_id = %s AND threshold = %s",
+    "delete_channel_arb_alerts": "DELETE FROM arb_alerts WHERE channel_id = %s",
+    "select_arb_alerts": "SELECT channel_id, threshold FROM arb_alerts",
+    "insert_price_tick": "INSERT INTO price_ticks (ts, exchange, bid, ask) VALUES (%s, %s, %s, %s)",
+    # Average bid/ask per exchange per `slot_seconds` since a time
+    "select_price_tick_slots": """
+        SELECT exchange, FLOOR(EXTRACT(EPOCH FROM ts) / %s) AS slot, AVG(bid), AVG(ask)
+        FROM price_ticks WHERE ts >= %s
+        GROUP BY exchange, slot ORDER BY slot
+    """,
+}
+
+# SQLite spellings where they differ (scalar MIN/MAX instead of LEAST/GREATEST)
+SQLITE_QUERIES = {
+    "upsert_balance_rollup": """
+        INSERT INTO balance_rollup AS r (resolution, token, wallet, bucket, min, max, last, last_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (resolution, token, wallet, bucket) DO UPDATE SET
+            min = MIN(r.min, EXCLUDED.min),
+            max = MAX(r.max, EXCLUDED.max),
+            last = CASE WHEN EXCLUDED.last_at >= r.last_at THEN EXCLUDED.last ELSE r.last END,
+            last_at = MAX(r.last_at, EXCLUDED.last_at)
+    """,
+    "select_group_balance_slots": """
+        WITH slots AS (
+            SELECT CAST((unixepoch(b.ts) - unixepoch(%s)) / %s AS INTEGER) AS slot, b.ts, SUM(b.amount) AS total FROM wallet_balances b
+            JOIN tracked_wallets w ON w.address = b.wallet
+            WHERE b.token = %s AND w.wallet_group = %s AND b.ts >= %s
+            GROUP BY b.ts
+        )
+        SELECT MIN(ts), MIN(total), MAX(total),
+               (SELECT t.total FROM slots t WHERE t.slot = s.slot ORDER BY t.ts DESC LIMIT 1)
+        FROM slots s GROUP BY slot ORDER BY slot
+    """,
+    "select_price_tick_slots": """
+        SELECT exchange, CAST(unixepoch(ts) / %s AS INTEGER) AS slot, AVG(bid), AVG(ask)
+        FROM price_ticks WHERE ts >= %s
+        GROUP BY exchange, slot ORDER BY slot
+    """,
+}
+
+# Rows written before snapshot buckets existed have a NULL bucket and sort after bucketed rows of the same day
+# (SQLite already sorts NULLs last on DESC but rejects NULLS LAST in an index definition)
+def _caw_cdc_indexes(nulls_last):
+    return [
+        "DROP INDEX IF EXISTS caw_cdc_date_idx",
+        f"CREATE INDEX IF NOT EXISTS caw_cdc_date_bucket_idx ON caw_cdc (date DESC, bucket DESC{nulls_last})",
+        "CREATE UNIQUE INDEX IF NOT EXISTS caw_cdc_bucket_idx ON caw_cdc (bucket)",
+    ]
+
+# Arbitrage alert subscriptions: one row per (channel, spread threshold in %)
+ARB_ALERTS_TABLE = """
+    CREATE TABLE IF NOT EXISTS arb_alerts (
+        channel_id BIGINT NOT NULL,
+        guild_id BIGINT,
+        threshold NUMERIC(10, 4) NOT NULL,
+        created_by BIGINT,
+        created_at TIMESTAMP NOT NULL,
+        PRIMARY KEY (channel_id, threshold)
+    )
+"""
+
+# Tracked tokens and wallets, edited at runtime (see tracking.py)
+TRACKING_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS tracked_tokens (
+        symbol TEXT PRIMARY KEY,
+        contract TEXT NOT NULL,
+        decimals INTEGER NOT NULL,
+        total_supply NUMERIC NOT NULL,
+        start_block BIGINT NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tracked_wallets (
+        address TEXT PRIMARY KEY,
+        wallet_group TEXT NOT NULL,
+        title TEXT NOT NULL,
+        position INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tracking_seeded (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        seeded_at TIMESTAMP NOT NULL
+    )
+    """,
+]
+
+# Balances as (ts, token, wallet, amount) rows, their rollups, and the transfer index per (token, wallet).
+# `exact` holds amounts that are read back and compared or summed exactly.
+def _balance_tables(numeric, exact):
+    return [
+        # Derived tables of the single-token layout; rebuilt under the per-token tables below
+        "DROP TABLE IF EXISTS caw_cdc_rollup",
+        "DROP TABLE IF EXISTS caw_transfers",
+        "DROP TABLE IF EXISTS caw_wallet_index",
+        f"""
+        CREATE TABLE IF NOT EXISTS wallet_balances (
+            ts TIMESTAMP NOT NULL,
+            token TEXT NOT NULL,
+            wallet TEXT NOT NULL,
+            amount {exact} NOT NULL,
+            PRIMARY KEY (token, wallet, ts)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS wallet_balances_token_ts_idx ON wallet_balances (token, ts)",
+        f"""
+        CREATE TABLE IF NOT EXISTS balance_rollup (
+            resolution TEXT NOT NULL,
+            token TEXT NOT NULL,
+            wallet TEXT NOT NULL,
+            bucket DATE NOT NULL,
+            min {numeric} NOT NULL,
+            max {numeric} NOT NULL,
+            last {numeric} NOT NULL,
+            last_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (resolution, token, wallet, bucket)
+        )
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS token_transfers (
+            token TEXT NOT NULL,
+            wallet TEXT NOT NULL,
+            block BIGINT NOT NULL,
+            ts TIMESTAMP NOT NULL,
+            tx_hash TEXT NOT NULL,
+            counterparty TEXT NOT NULL,
+            amount {numeric} NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS token_transfers_token_ts_idx ON token_transfers (token, ts)",
+        f"""
+        CREATE TABLE IF NOT EXISTS token_wallet_index (
+            token TEXT NOT NULL,
+            wallet TEXT NOT NULL,
+            cursor_block BIGINT NOT NULL,
+            balance {exact} NOT NULL,
+            inflow {exact} NOT NULL,
+            outflow {exact} NOT NULL,
+            updated_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (token, wallet)
+        )
+        """,
+    ]
+
+# Exact NUMERIC columns so stored balances match on-chain values.
+# caw_cdc is the old one-column-per-wallet snapshot table, kept only to be copied into wallet_balances once.
+POSTGRES_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS caw_cdc (
+        date DATE NOT NULL,
+        wallet_3da3 NUMERIC(38, 18),
+        wallet_667 NUMERIC(38, 18),
+        wallet_825b NUMERIC(38, 18),
+        sum NUMERIC(38, 18),
+        bucket TIMESTAMP,
+        burn NUMERIC(38, 18)
+    )
+    """,
+    """
+    DO $$
+    BEGIN
+        IF EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name = 'caw_cdc' AND column_name = 'sum' AND data_type <> 'numeric') THEN
+            ALTER TABLE caw_cdc
+                ALTER COLUMN wallet_3da3 TYPE NUMERIC(38, 18),
+                ALTER COLUMN wallet_667 TYPE NUMERIC(38, 18),
+                ALTER COLUMN wallet_825b TYPE NUMERIC(38, 18),
+                ALTER COLUMN sum TYPE NUMERIC(38, 18);
+        END IF;
+    END $$
+    """,
+    "ALTER TABLE caw_cdc ADD COLUMN IF NOT EXISTS bucket TIMESTAMP, ADD COLUMN IF NOT EXISTS burn NUMERIC(38, 18)",
+    *_caw_cdc_indexes(" NULLS LAST"),
+    ARB_ALERTS_TABLE,
+    # Monthly partitions are created on demand by ticks.py
+    """
+    CREATE TABLE IF NOT EXISTS price_ticks (
+        ts TIMESTAMP NOT NULL,
+        exchange TEXT NOT NULL,
+        bid DOUBLE PRECISION NOT NULL,
+        ask DOUBLE PRECISION NOT NULL
+    ) PARTITION BY RANGE (ts)
+    """,
+    "CREATE INDEX IF NOT EXISTS price_ticks_ts_idx ON price_ticks (ts)",
+    *TRACKING_TABLES,
+    *_balance_tables("NUMERIC(38, 18)", "NUMERIC(38, 18)"),
+]
+
+SQLITE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS caw_cdc (
+        date DATE NOT NULL,
+        wallet_3da3 NUMERIC,
+        wallet_667 NUMERIC,
+        wallet_825b NUMERIC,
+        sum NUMERIC,
+        bucket TIMESTAMP,
+        burn NUMERIC
+    )
+    """,
+    *_caw_cdc_indexes(""),
+    ARB_ALERTS_TABLE,
+    """
+    CREATE TABLE IF NOT EXISTS price_ticks (
+        ts TIMESTAMP NOT NULL,
+        exchange TEXT NOT NULL,
+        bid REAL NOT NULL,
+        ask REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS price_ticks_ts_idx ON price_ticks (ts)",
+    *TRACKING_TABLES,
+    *_balance_tables("NUMERIC", "DECIMAL_TEXT"),
+]
+
+class SQLitePool:
+    """Minimal pool with the psycopg2 pool interface, for running against a local SQLite file."""
+
+    def __init__(self, maxconn, path):
+        self.path = path
+        self._idle = queue.LifoQueue()
+        for _ in range(maxconn):
+            self._idle.put(self._connect())
+
+    def _connect(self):
+        return sqlite3.connect(self.path, check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES)
+
+    def getconn(self):
+        return self._idle.get()
+
+    def putconn(self, conn, close=False):
+        if close:
+            conn.close()
+            conn = self._connect()
+        self._idle.put(conn)
+
+    def closeall(self):
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_converter("NUMERIC", lambda value: Decimal(value.decode()))
+# NUMERIC affinity rounds long decimals through REAL; balances and the transfer index's running totals stay text
+sqlite3.register_converter("DECIMAL_TEXT", lambda value: Decimal(value.decode()))
+
+_pool = None
+_backend = None
+_executor = None
+# connection -> names PREPAREd on it; weak, so a connection the pool closes takes its entry along
+_prepared = weakref.WeakKeyDictionary()
+_database_url = None  # Set by configure(); the pool itself is opened on first use
+_connect_lock = None
+
+def init_pool(database_url):
+    """Opens the pool and makes sure the schema exists. `sqlite:///path` selects the SQLite stand-in."""
+    global _pool, _backend, _executor
+    if database_url.startswith("sqlite:///"):
+        _backend = "sqlite"
+        _pool = SQLitePool(DB_POOL_MAX, database_url[len("sqlite:///"):])
+    else:
+        import psycopg2.pool
+        _backend = "postgres"
+        _pool = psycopg2.pool.ThreadedConnectionPool(DB_POOL_MIN, DB_POOL_MAX, database_url, sslmode="require")
+    _executor = ThreadPoolExecutor(max_workers=DB_POOL_MAX, thread_name_prefix="db")
+    _run_script(POSTGRES_SCHEMA if _backend == "postgres" else SQLITE_SCHEMA)
+
+def configure(database_url):
+    """Remembers where the database is without connecting, so startup never waits on it."""
+    global _database_url
+    _database_url = database_url
+
+async def connect():
+    """Opens the configured pool off the event loop on first use; afterwards returns at once."""
+    global _connect_lock
+    if _pool is not None:
+        return
+    if _database_url is None:
+        raise RuntimeError("Database is not configured (set DATABASE_URL)")
+    if _connect_lock is None:
+        _connect_lock = asyncio.Lock()
+    async with _connect_lock:
+        if _pool is None:
+            await asyncio.to_thread(init_pool, _database_url)
+
+def backend():
+    """"postgres" or "sqlite", once init_pool() has run."""
+    return _backend
+
+def close_pool():
+    global _pool, _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+    if _pool is not None:
+        _pool.closeall()
+        _pool = None
+    _prepared.clear()
+
+def _run_script(statements):
+    conn = _pool.getconn()
+    try:
+        cur = conn.cursor()
+        for statement in statements:
+            cur.execute(statement)
+        conn.commit()
+        cur.close()
+    finally:
+        _pool.putconn(conn)
+
+async def run_script(statements):
+    """Runs ad-hoc DDL (e.g. creating partitions) off the event loop in one transaction."""
+    await connect()
+    await asyncio.get_running_loop().run_in_executor(_executor, _run_script, statements)
+
+def _execute(cur, conn, name, params):
+    if _backend == "sqlite":
+        sql = SQLITE_QUERIES.get(name, QUERIES[name])
+        cur.execute(sql.replace("%s", "?"), params)  # sqlite3 caches the compiled statement
+        return
+    sql = QUERIES[name]
+    prepared = _prepared.setdefault(conn, set())
+    if name not in prepared:
+        counter = iter(range(1, len(params) + 1))
+        cur.execute(f"PREPARE {name} AS {re.sub('%s', lambda _: f'${next(counter)}', sql)}")
+        prepared.add(name)
+    placeholders = ", ".join(["%s"] * len(params))
+    cur.execute(f"EXECUTE {name} ({placeholders})" if params else f"EXECUTE {name}", params)
+
+def _run(steps, fetch):
+    """Runs each (name, params) step in order, all in one transaction."""
+    conn = _pool.getconn()
+    broken = False
+    try:
+        cur = conn.cursor()
+        rows = 0
+        for name, params in steps:
+            _execute(cur, conn, name, params)
+            rows = cur.fetchall() if fetch else rows + cur.rowcount
+        conn.commit()
+        cur.close()
+        return rows
+    except Exception as e:
+        broken = getattr(conn, "closed", 0) != 0 or type(e).__name__ in ("OperationalError", "InterfaceError")
+        try:
+            conn.rollback()
+        except Exception:
+            broken = True
+        raise
+    finally:
+        if broken:
+            _prepared.pop(conn, None)
+        _pool.putconn(conn, close=broken)
+
+async def _submit(label, steps, fetch):
+    await connect()
+    # Timed from the event loop's side, so executor and pool waits count too
+    with timed("db_query_seconds", "query", label):
+        return await asyncio.get_running_loop().run_in_executor(_executor, _run, steps, fetch)
+
+async def fetch(name, *params):
+    """Runs a named SELECT on a pooled connection off the event loop and returns all rows."""
+    return await _submit(name, [(name, params)], True)
+
+async def execute(name, *params):
+    """Runs a named INSERT/UPDATE/DELETE off the event loop and returns the row count."""
+    return await _submit(name, [(name, params)], False)
+
+async def execute_many(name, param_rows):
+    """Runs a named write once per params tuple, all in a single transaction."""
+    return await _submit(name, [(name, params) for params in param_rows], False)
+
+async def execute_batch(steps):
+    """Runs different named writes, given as (name, params) pairs, all in a single transaction."""
+    steps = list(steps)
+    return await _submit("+".join(sorted({name for name, _ in steps})), steps, False)
@@ -1,38 +1,112 @@
+import time
+STARTED_AT = time.perf_counter()  # Cold start is measured from here to the first gateway READY
+
+import asyncio
 import discord
-import requests
 import os
-import psycopg2
+import re
+import secrets
+import subprocess
+import sys
+import traceback
 from discord.ext import commands
-from get_balances import get_caw_balances
-from datetime import datetime
+from cache import cache_stats
+from health import breaker_stats
+from config import METRICS_HOST, METRICS_PORT, BOT_ROLE, SHARD_COUNT, SHARD_IDS, SHARD_PROCESSES, HUB_AUTHKEY
+from upstream import close_session
+from scheduler import PRIORITY, INTERACTIVE
+import metrics
+import db
 
 TOKEN = os.getenv("TOKEN")  # Discord Bot Token
-CMC_API_KEY = os.getenv("CMC_API_KEY")  # CoinMarketCap API Key
 DATABASE_URL = os.getenv("DATABASE_URL")  # PostgreSQL Database URL
-CMC_API_URL = "https://pro-api.coinmarketcap.com/v1/cryptocurrency/quotes/latest"
+
+# 📌 Command groups, loaded in the background once the gateway is ready
+EXTENSIONS = ["cogs.prices", "cogs.wallets", "cogs.history", "cogs.exchange"]
 
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix="!", intents=intents)
-
-# Connect to PostgreSQL
-def get_db_connection():
-    return psycopg2.connect(DATABASE_URL, sslmode="require")
-
-# Format numbers for display with commas
-def format_large_number(value):
-    if value >= 1_000_000_000_000:
-        return f"{value / 1_000_000_000_000:.2f}T".replace(",", "")  # Trillions
-    elif value >= 1_000_000_000:
-        return f"{value / 1_000_000_000:.2f}B".replace(",", "")  # Billions
-    elif value >= 1_000_000:
-        return f"{value / 1_000_000:.2f}M".replace(",", "")  # Millions
-    else:
-        return f"{value:,.2f}"  # Numbers under a million with commas
+if SHARD_COUNT:
+    bot = commands.AutoShardedBot(command_prefix="!", intents=intents, shard_count=SHARD_COUNT, shard_ids=SHARD_IDS or None)
+else:
+    bot = commands.Bot(command_prefix="!", intents=intents)
+
+# ⏱️ Command latency and priority: before/after invoke hooks run around every command, failed ones included
+@bot.before_invoke
+async def start_command_timer(ctx):
+    ctx.started_at = time.perf_counter()
+    PRIORITY.set(INTERACTIVE)  # Upstream calls made for this command go ahead of the pollers
+
+@bot.after_invoke
+async def stop_command_timer(ctx):
+    metrics.observe("bot_command_seconds", time.perf_counter() - ctx.started_at, "command", ctx.command.qualified_name)
+
+async def load_extensions():
+    for extension in EXTENSIONS:
+        try:
+            await bot.load_extension(extension)
+        except commands.ExtensionError as e:
+            print(f"Failed to load {extension}: {e}")
+
+# 🚨 Arbitrage alerts go out over the REST API, so the hub can send them without a gateway connection
+def alert_sender(client):
+    async def send_alert(channel_id, message):
+        try:
+            await client.get_partial_messageable(channel_id).send(message)
+        except discord.HTTPException as e:
+            print(f"Could not send alert to channel {channel_id}: {e}")
+    return send_alert
+
+_background = None  # Startup work kicked off by the first on_ready
+_metrics_runner = None
+_hub = None  # Pollers owned by this process (standalone mode only)
+
+async def start_metrics():
+    global _metrics_runner
+    if METRICS_PORT:
+        _metrics_runner = await metrics.start_server(METRICS_HOST, METRICS_PORT)
+    asyncio.create_task(metrics.watch_event_loop_lag())
+
+async def start_background():
+    """Everything the gateway connection doesn't need: metrics, command groups and the pollers.
+
+    The database pool opens on the first query rather than here (see db.connect).
+    """
+    global _hub
+    await start_metrics()
+    await load_extensions()
+    if BOT_ROLE == "standalone":
+        from hub import service
+        await service.start(alert_sender(bot))
+        _hub = service
+    print(f"Loaded {len(bot.cogs)} command groups {time.perf_counter() - STARTED_AT:.2f}s after start")
 
 @bot.event
 async def on_ready():
+    global _background
     print(f'Logged in as {bot.user}')
+    if _background is None:  # on_ready fires again after every reconnect
+        ready = time.perf_counter() - STARTED_AT
+        metrics.observe("bot_startup_seconds", ready)
+        print(f"Gateway ready {ready:.2f}s after start")
+        _background = asyncio.create_task(start_background())
+        _background.add_done_callback(_background_done)
+
+def _background_done(task):
+    # Nothing awaits the startup task, so without this a failure there would go unnoticed
+    if not task.cancelled() and task.exception() is not None:
+        print("Background startup failed:")
+        traceback.print_exception(task.exception())
+
+# `!compare_cdc_<number>` is rewritten to `!compare_cdc <number>` before normal command parsing
+COMPARE_CDC_N = re.compile(r"^!compare_cdc_(\d+)(\s+\S+)?$")
+
+@bot.event
+async def on_message(message):
+    match = COMPARE_CDC_N.match(message.content.strip())
+    if match and not message.author.bot:
+        message.content = f"!compare_cdc {match.group(1)}{match.group(2) or ''}"
+    await bot.process_commands(message)
 
 # 📌 Help Command
 @bot.command()
@@ -49,274 +123,136 @@ async def helpme(ctx):
   *Get the market cap of a cryptocurrency.*
   **Example:** `!mc ETH` → Shows Ethereum's market cap.
 
-**📂 CDC Wallet Balances**
-- `!cdc`
-  *Fetches and displays the latest CDC wallet balances and saves them to the database.*
-  **Example:** `!cdc` → Shows balances and records them in the database.
+**📂 CDC Wallet Balances** (CAW unless another tracked token is given)
+- `!cdc [token]`
+  *Displays the latest CDC wallet balances (recorded automatically in the background).*
+  **Example:** `!cdc fresh` → Fetches live balances now and records them in the database.
 
-- `!compare_cdc`
-  *Compares the latest CDC wallet balances with the previous record.*
+- `!compare_cdc [number] [token]`
+  *Compares the latest CDC wallet balances with the previous record (or a number of entries back).*
 
-- `!compare_cdc_<number>`
+- `!compare_cdc_<number> [token]`
   *Compares the latest CDC wallet balances with a specified number of entries back.*
 
-- `!compare_cdc_last10`
+- `!compare_cdc_last10 [token]`
   *Displays the last 10 records in a tabular format.*
 
+- `!cdc_history <days> [points] [token]`
+  *Shows the CDC total over a longer range (min/max/last per day, week or month).*
+
+- `!cdc_flow [days] [token]`
+  *Shows tokens flowing in and out of each wallet (default: last 7 days), from indexed transfers.*
+
 **💱 Exchange Data**
 - `!ex`
-  *Fetches and compares the ask and bid prices for CAW/USDT on Gate.io, AscendEx, and Crypto.com.*
+  *Fetches and compares the ask and bid prices for CAW/USDT on every tracked exchange (Gate.io, AscendEx, Crypto.com).*
+
+- `!spread_history [minutes]`
+  *Shows how the best cross-exchange spread moved, from prices the bot already recorded.*
+
+- `!alert add <spread %>` / `!alert remove [<spread %>]` / `!alert list`
+  *Posts in this channel when the CAW arbitrage spread after fees crosses the threshold. Adding and removing needs Manage Channels.*
 
 **ℹ️ Need Help?**
 Use `!helpme` anytime to see this list again.
 """
     await ctx.send(help_message)
 
-# 📌 CDC Wallet Titles (excluding Burn)
-CDC_WALLET_TITLES = ["wallet_3da3", "wallet_667", "wallet_825b"]
-BURN_WALLET_TITLE = "Burn"
+# 📌 Latency percentiles, quote cache counters and upstream health (bot owner only)
+def format_latency(seconds):
+    return "+Inf" if seconds == float("inf") else f"≤{seconds * 1000:g}ms"
 
-# 📌 Format number to Trillions (T)
-def format_trillions(value):
-    return f"{value / 1_000_000_000_000:.2f} T"
-
-# 📌 Format number to Trillions (T)
-def format_billions(value):
-    return f"{value / 1_000_000_000:.2f} B"
-
-# 📌 Get Crypto Balances for CDC Wallets and Save to Database
 @bot.command()
-async def cdc(ctx):
-    cdc_balances, burn_balance, cdc_total, cdc_percentage = get_caw_balances()
-
-    if cdc_balances:
-        message = "**📊 CDC Wallet Balances:**\n"
-
-        # Print individual CDC balances
-        for title, balance in zip(CDC_WALLET_TITLES, cdc_balances):
-            message += f"- **{title}:** {format_trillions(balance)} CAW\n"
-
-        # Print CDC total and percentage
-        message += f"\n**Total CDC Holdings: {format_trillions(cdc_total)} CAW**"
-        message += f"\n**Percentage of Total Supply: {cdc_percentage:.4f}%**"
-
-        # Show Burn wallet separately
-        message += f"\n\n🔥 **{BURN_WALLET_TITLE}: {format_trillions(burn_balance)} CAW** 🔥"
-
-        # Save data to PostgreSQL
-        conn = get_db_connection()
-        cur = conn.cursor()
-        now = datetime.now()
-        cur.execute("""
-            INSERT INTO caw_cdc (date, wallet_3da3, wallet_667, wallet_825b, sum)
-            VALUES (%s, %s, %s, %s, %s)
-        """, (now.date(), cdc_balances[0], cdc_balances[1], cdc_balances[2], cdc_total))
-        conn.commit()
-        cur.close()
-        conn.close()
-
-        await ctx.send(message)
-    else:
-        await ctx.send("❌ Unable to fetch balances!")
-
-# 📊 Compare CDC Wallets
-@bot.command()
-async def compare_cdc_last10(ctx):
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    cur.execute("""
-        SELECT date, wallet_3da3, wallet_667, wallet_825b, sum FROM caw_cdc
-        ORDER BY date DESC
-        LIMIT 10
-    """)
-
-    records = cur.fetchall()
-    cur.close()
-    conn.close()
-
-    message = "**📊 Last 10 CDC Wallet Records:**\n"
-    message += "```\nDate        | 3DA3          | 667F          | 825B          | Sum           \n"
-    message += "-----------------------------------------------------------\n"
-    for record in records:
-        date, w3da3, w667f, w825b, total = record
-        message += f"{date} | {format_trillions(w3da3):<13} | {format_trillions(w667f):<13} | {format_trillions(w825b):<13} | {format_trillions(total):<13}\n"
-    message += "```"
-
-    await ctx.send(message)
-
-def get_gateio_caw_data():
-    """Retrieves the ask and bid price of CAW/USDT from Gate.io with 11 decimal places."""
-    base_url = "https://api.gateio.ws/api/v4"
-    currency_pair = "CAW_USDT"
-
+@commands.is_owner()
+async def stats(ctx):
+    lines = ["**⏱️ Latency (p50 / p99, bucket bounds):**"]
+    for (name, label, value), histogram in sorted(metrics.HISTOGRAMS.items(), key=lambda item: str(item[0])):
+        series = f"{name} {value}" if label else name
+        lines.append(f"- **{series}:** {format_latency(histogram.quantile(0.5))} / "
+                     f"{format_latency(histogram.quantile(0.99))} over {histogram.count}")
+    if len(lines) == 1:
+        lines.append("No samples yet.")
+    lines.append("**🗄️ Quote Cache:**")
+    for source, counters in cache_stats().items():
+        lines.append(f"- **{source}:** {counters['hits']} hits, {counters['misses']} misses, "
+                     f"{counters['coalesced']} coalesced, {counters['entries']} entries")
+    lines.append("**🔌 Upstreams:**")
+    for api, health in breaker_stats().items():
+        line = f"- **{api}:** {health['state']}, tripped {health['trips']}x"
+        if health["state"] != "closed":
+            line += f", last error: {health['last_error']}"
+        lines.append(line)
+    message = "\n".join(lines)
+    await ctx.send(message if len(message) <= 2000 else message[:1997] + "...")
+
+async def shutdown():
+    if _hub is not None:
+        await _hub.stop()
+    await close_session()
+    await asyncio.to_thread(db.close_pool)
+    if _metrics_runner is not None:
+        await _metrics_runner.cleanup()
+
+# 🟢 Run the Bot (standalone, or one shard process)
+async def main():
+    discord.utils.setup_logging()
+    db.configure(DATABASE_URL)
     try:
-        ticker_endpoint = f"{base_url}/spot/tickers?currency_pair={currency_pair}"
-        response = requests.get(ticker_endpoint)
-        response.raise_for_status()
-        data = response.json()
-
-        if data and isinstance(data, list) and len(data) > 0:
-            ticker_info = data[0]
-            ask = ticker_info.get('lowest_ask')
-            bid = ticker_info.get('highest_bid')
-            return {"exchange": "Gate.io", "buy_price": f"{float(bid):.11f}" if bid else None, "sell_price": f"{float(ask):.11f}" if ask else None}
-        else:
-            return {"exchange": "Gate.io", "error": f"Could not retrieve ticker data for {currency_pair}"}
-
-    except requests.exceptions.RequestException as e:
-        return {"exchange": "Gate.io", "error": f"API request error: {e}"}
-    except json.JSONDecodeError as e:
-        return {"exchange": "Gate.io", "error": f"JSON decoding error: {e}"}
-    except Exception as e:
-        return {"exchange": "Gate.io", "error": f"An unexpected error occurred: {e}"}
-
-def get_ascendex_caw_data():
-    """Retrieves the ask and bid price of CAW/USDT from AscendEx with 11 decimal places."""
-    base_url = "https://ascendex.com/api/pro/v1"
-    symbol = "$CAW/USDT"  # Corrected symbol
-
+        async with bot:
+            await bot.start(TOKEN)
+    finally:
+        await shutdown()
+
+# 🛰️ Hub process: owns the pollers and serves the shards, with no gateway connection of its own
+async def run_hub():
+    global _hub
+    from hub import service, serve
+    discord.utils.setup_logging()
+    db.configure(DATABASE_URL)
+    client = discord.Client(intents=discord.Intents.none())
     try:
-        ticker_endpoint = f"{base_url}/spot/ticker?symbol={symbol}"
-        response = requests.get(ticker_endpoint)
-        response.raise_for_status()
-        data = response.json()
-
-        if data and 'data' in data and isinstance(data['data'], dict):
-            ticker_info = data['data']
-            ask = ticker_info.get('ask')
-            bid = ticker_info.get('bid')
-            return {"exchange": "AscendEx", "buy_price": f"{float(bid[0]):.11f}" if bid else None, "sell_price": f"{float(ask[0]):.11f}" if ask else None}
-        else:
-            return {"exchange": "AscendEx", "error": f"Could not retrieve ticker data for {symbol}"}
-
-    except requests.exceptions.RequestException as e:
-        return {"exchange": "AscendEx", "error": f"API request error: {e}"}
-    except json.JSONDecodeError as e:
-        return {"exchange": "AscendEx", "error": f"JSON decoding error: {e}"}
-    except Exception as e:
-        return {"exchange": "AscendEx", "error": f"An unexpected error occurred: {e}"}
-
-def get_crypto_com_caw_data():
-    """Retrieves the ask and bid price of CAW_USDT from Crypto.com with 11 decimal places."""
-    base_url = "https://api.crypto.com/v2"
-    instrument_name = "CAW_USDT"
-
+        await client.login(TOKEN)  # REST only, for sending alerts
+        await service.start(alert_sender(client))
+        _hub = service
+        serve(service, asyncio.get_running_loop())
+        await start_metrics()
+        print(f"Hub ready {time.perf_counter() - STARTED_AT:.2f}s after start")
+        await asyncio.Event().wait()
+    finally:
+        await client.close()
+        await shutdown()
+
+def launch():
+    """Starts the hub and SHARD_PROCESSES shard processes; stops them all once any one exits."""
+    shard_count = SHARD_COUNT or SHARD_PROCESSES
+    base_env = dict(os.environ, SHARD_COUNT=str(shard_count), HUB_AUTHKEY=HUB_AUTHKEY.decode() or secrets.token_hex(16))
+    children = []
+    for index in range(SHARD_PROCESSES + 1):
+        env = dict(base_env, BOT_ROLE="hub" if index == 0 else "shard")
+        if index:
+            env["SHARD_IDS"] = ",".join(map(str, range(index - 1, shard_count, SHARD_PROCESSES)))
+        if METRICS_PORT:
+            env["METRICS_PORT"] = str(METRICS_PORT + index)  # One metrics endpoint per process
+        children.append(subprocess.Popen([sys.executable, os.path.abspath(__file__)], env=env))
     try:
-        ticker_endpoint = f"{base_url}/public/get-ticker?instrument_name={instrument_name}"
-        response = requests.get(ticker_endpoint)
-        response.raise_for_status()
-        data = response.json()
-
-        if data and data.get('result') and data['result'].get('data') and len(data['result']['data']) > 0:
-            ticker_info = data['result']['data'][0]
-            ask = ticker_info.get('a')
-            bid = ticker_info.get('b')
-            return {"exchange": "Crypto.com", "buy_price": f"{float(bid):.11f}" if bid else None, "sell_price": f"{float(ask):.11f}" if ask else None}
-        else:
-            return {"exchange": "Crypto.com", "error": f"Could not retrieve ticker data for {instrument_name}"}
-
-    except requests.exceptions.RequestException as e:
-        return {"exchange": "Crypto.com", "error": f"API request error: {e}"}
-    except json.JSONDecodeError as e:
-        return {"exchange": "Crypto.com", "error": f"JSON decoding error: {e}"}
-    except Exception as e:
-        return {"exchange": "Crypto.com", "error": f"An unexpected error occurred: {e}"}
-
-@bot.command()
-async def ex(ctx):
-    """Fetches and compares the ask and bid prices for CAW/USDT on Gate.io, AscendEx, and Crypto.com."""
-    gateio_data = get_gateio_caw_data()
-    ascendex_data = get_ascendex_caw_data()
-    crypto_com_data = get_crypto_com_caw_data()
-    arbitrage_amount = 2000000000  # 2 billion CAW tokens
-
-    message = "--- CAW/USDT Exchange Comparison ---\n"
-    message += "---------------------------------------\n"
-    has_data = False  # Flag to check if any data was successfully fetched
-
-    # Gate.io Output
-    message += "**Gate.io:**\n"
-    if "error" in gateio_data:
-        message += f"  Error: {gateio_data['error']}\n"
-        gateio_sell_price = None
-        gateio_buy_price = None
-    else:
-        gateio_buy_price = gateio_data['buy_price']
-        gateio_sell_price = gateio_data['sell_price']
-        message += f"  Selling Price (Ask): {gateio_sell_price}\n"
-        message += f"  Buying Price (Bid): {gateio_buy_price}\n"
-        has_data = True
-    message += "---------------------------------------\n"
-
-    # AscendEx Output
-    message += "**AscendEx:**\n"
-    if "error" in ascendex_data:
-        message += f"  Error: {ascendex_data['error']}\n"
-        ascendex_sell_price = None
-        ascendex_buy_price = None
-    else:
-        ascendex_buy_price = ascendex_data['buy_price']
-        ascendex_sell_price = ascendex_data['sell_price']
-        message += f"  Selling Price (Ask): {ascendex_sell_price}\n"
-        message += f"  Buying Price (Bid): {ascendex_buy_price}\n"
-        has_data = True
-    message += "---------------------------------------\n"
-
-    # Crypto.com Output
-    message += "**Crypto.com:**\n"
-    if "error" in crypto_com_data:
-        message += f"  Error: {crypto_com_data['error']}\n"
-        crypto_com_sell_price = None
-        crypto_com_buy_price = None
+        while all(child.poll() is None for child in children):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for child in children:
+            if child.poll() is None:
+                child.terminate()
+        for child in children:
+            child.wait()
+    sys.exit(next((child.returncode for child in children if child.returncode), 0))
+
+if __name__ == "__main__":
+    if BOT_ROLE in ("hub", "shard") and not HUB_AUTHKEY:
+        sys.exit("HUB_AUTHKEY must be set for the hub and shard roles (the launcher generates one)")
+    if BOT_ROLE == "hub":
+        asyncio.run(run_hub())
+    elif BOT_ROLE == "standalone" and SHARD_PROCESSES > 1:
+        launch()
     else:
-        crypto_com_buy_price = crypto_com_data['buy_price']
-        crypto_com_sell_price = crypto_com_data['sell_price']
-        message += f"  Selling Price (Ask): {crypto_com_sell_price}\n"
-        message += f"  Buying Price (Bid): {crypto_com_buy_price}\n"
-        has_data = True
-    message += "---------------------------------------\n"
-
-    # Comparison and Potential Arbitrage
-    message += "\n--- Potential Arbitrage Opportunity (for 2 Billion CAW) ---\n"
-
-    def check_arbitrage(buy_exchange, sell_price, sell_exchange, buy_price):
-        nonlocal message
-        if sell_price and buy_price:
-            try:
-                sell_price_float = float(sell_price)
-                buy_price_float = float(buy_price)
-                if sell_price_float < buy_price_float:
-                    cost = arbitrage_amount * sell_price_float
-                    revenue = arbitrage_amount * buy_price_float
-                    profit = revenue - cost
-                    message += f"Buy on {buy_exchange}, sell on {sell_exchange}:\n"
-                    message += f"  Buy Price on {buy_exchange}: {sell_price}\n"
-                    message += f"  Sell Price on {sell_exchange}: {buy_price}\n"
-                    message += f"  Cost to buy {format_billions(arbitrage_amount)} CAW: {cost:.2f} USDT\n"
-                    message += f"  Revenue from selling {format_billions(arbitrage_amount)} CAW: {revenue:.2f} USDT\n"
-                    message += f"  Potential Profit (without fees): {profit:.2f} USDT\n"
-                    message += "---------------------------------------\n"
-                else:
-                    message += f"No direct arbitrage (Buy from {buy_exchange} -> Sell to {sell_exchange}) at this moment.\n"
-                    message += "---------------------------------------\n"
-            except ValueError:
-                message += f"Error converting price to float for arbitrage check between {buy_exchange} and {sell_exchange}.\n"
-        else:
-            message += f"Could not check arbitrage between {buy_exchange} and {sell_exchange} due to missing price data.\n"
-
-    message += "\n--- Arbitrage Opportunities ---\n"
-    check_arbitrage("Gate.io", gateio_sell_price, "AscendEx", ascendex_buy_price)
-    check_arbitrage("Gate.io", gateio_sell_price, "Crypto.com", crypto_com_buy_price)
-    check_arbitrage("AscendEx", ascendex_sell_price, "Gate.io", gateio_buy_price)
-    check_arbitrage("AscendEx", ascendex_sell_price, "Crypto.com", crypto_com_buy_price)
-    check_arbitrage("Crypto.com", crypto_com_sell_price, "Gate.io", gateio_buy_price)
-    check_arbitrage("Crypto.com", crypto_com_sell_price, "AscendEx", ascendex_buy_price)
-
-    if has_data:
-        await ctx.send(message)
-    else:
-        await ctx.send("❌ Failed to fetch exchange data from all sources.")
-
-# 🟢 Run the Bot
-bot.run(TOKEN)
+        asyncio.run(main())
@@ -0,0 +1,281 @@
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field, replace
+from decimal import Decimal
+import aiohttp
+from config import EXCHANGE_TIMEOUT, EXCHANGE_DEADLINE, EXCHANGE_VENUES, EXCHANGE_WS_OVERRIDE, ORDER_BOOK_DEPTH, STALE_MAX_AGE
+from upstream import get_json
+from cache import get_cache
+from amounts import to_price
+
+@dataclass(frozen=True)
+class Quote:
+    """Top-of-book quote from one exchange."""
+    exchange: str
+    bid: Decimal  # Highest buy order (what we can sell at)
+    ask: Decimal  # Lowest sell order (what we can buy at)
+    received_at: float = field(default_factory=time.time)  # Epoch seconds, for staleness checks
+    stale: bool = False  # Last good quote, served because the exchange is failing right now
+
+    @property
+    def age(self):
+        return time.time() - self.received_at
+
+@dataclass(frozen=True)
+class OrderBook:
+    """L2 depth from one exchange: (price, quantity) levels, best first."""
+    exchange: str
+    bids: list  # Descending price
+    asks: list  # Ascending price
+    received_at: float = field(default_factory=time.time)
+
+def _levels(rows):
+    return [(to_price(row[0]), to_price(row[1])) for row in rows]
+
+# Called with every freshly fetched REST Quote (cache hits excluded)
+QUOTE_LISTENERS = []
+
+class ExchangeAdapter:
+    """Base class for exchange adapters; subclasses build the ticker URL and parse its JSON.
+
+    Adapters that support streaming also set `ws_url` and implement the `ws_*`/`parse_ws` hooks.
+    """
+    key = None  # Registry key, set by register_adapter
+    name = None
+    ws_url = None
+    ws_warmup = 0  # Seconds to wait after connecting before subscribing
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    def ticker_url(self):
+        raise NotImplementedError
+
+    def parse_ticker(self, data):
+        """Turns a decoded ticker response into a Quote; raises ValueError if it has no prices."""
+        raise NotImplementedError
+
+    async def fetch_quote(self):
+        data = await get_json(self.ticker_url(), EXCHANGE_TIMEOUT)
+        quote = self.parse_ticker(data)
+        for callback in QUOTE_LISTENERS:
+            callback(quote)
+        return quote
+
+    def depth_url(self):
+        raise NotImplementedError
+
+    def parse_depth(self, data):
+        """Turns a decoded order book response into an OrderBook; raises ValueError if it is empty."""
+        raise NotImplementedError
+
+    async def fetch_depth(self):
+        data = await get_json(self.depth_url(), EXCHANGE_TIMEOUT)
+        return self.parse_depth(data)
+
+    def stream_url(self):
+        """WebSocket URL, or the local stand-in from EXCHANGE_WS_OVERRIDE."""
+        return f"{EXCHANGE_WS_OVERRIDE.rstrip('/')}/{self.key}" if EXCHANGE_WS_OVERRIDE else self.ws_url
+
+    def ws_subscribe(self):
+        """Messages to send after connecting."""
+        raise NotImplementedError
+
+    def ws_reply(self, message):
+        """Reply for an application-level heartbeat, or None."""
+        return None
+
+    def parse_ws(self, message):
+        """Quote from a decoded stream message, or None for anything else (acks, heartbeats)."""
+        raise NotImplementedError
+
+# 📌 Adapter registry (config key -> adapter class)
+ADAPTERS = {}
+
+def register_adapter(key):
+    def decorator(cls):
+        cls.key = key
+        ADAPTERS[key] = cls
+        return cls
+    return decorator
+
+@register_adapter("gateio")
+class GateioAdapter(ExchangeAdapter):
+    name = "Gate.io"
+    base_url = "https://api.gateio.ws/api/v4"
+    ws_url = "wss://api.gateio.ws/ws/v4/"
+
+    def ticker_url(self):
+        return f"{self.base_url}/spot/tickers?currency_pair={self.symbol}"
+
+    def parse_ticker(self, data):
+        if not (data and isinstance(data, list)):
+            raise ValueError(f"Could not retrieve ticker data for {self.symbol}")
+        ticker_info = data[0]
+        return Quote(self.name, to_price(ticker_info.get('highest_bid')), to_price(ticker_info.get('lowest_ask')))
+
+    def depth_url(self):
+        return f"{self.base_url}/spot/order_book?currency_pair={self.symbol}&limit={ORDER_BOOK_DEPTH}"
+
+    def parse_depth(self, data):
+        if not (data and data.get('bids') and data.get('asks')):
+            raise ValueError(f"Could not retrieve order book for {self.symbol}")
+        return OrderBook(self.name, _levels(data['bids']), _levels(data['asks']))
+
+    def ws_subscribe(self):
+        return [{"time": int(time.time()), "channel": "spot.book_ticker", "event": "subscribe", "payload": [self.symbol]}]
+
+    def parse_ws(self, message):
+        if message.get("channel") != "spot.book_ticker" or message.get("event") != "update":
+            return None
+        result = message["result"]
+        return Quote(self.name, to_price(result.get("b")), to_price(result.get("a")))
+
+@register_adapter("ascendex")
+class AscendexAdapter(ExchangeAdapter):
+    name = "AscendEx"
+    base_url = "https://ascendex.com/api/pro/v1"
+    ws_url = "wss://ascendex.com/0/api/pro/v1/stream"
+
+    def ticker_url(self):
+        return f"{self.base_url}/spot/ticker?symbol={self.symbol}"
+
+    def parse_ticker(self, data):
+        if not (data and isinstance(data.get('data'), dict)):
+            raise ValueError(f"Could not retrieve ticker data for {self.symbol}")
+        ticker_info = data['data']
+        bid = ticker_info.get('bid') or [None]  # [price, size]
+        ask = ticker_info.get('ask') or [None]
+        return Quote(self.name, to_price(bid[0]), to_price(ask[0]))
+
+    def depth_url(self):
+        return f"{self.base_url}/depth?symbol={self.symbol}"
+
+    def parse_depth(self, data):
+        book = ((data or {}).get('data') or {}).get('data') or {}
+        if not (book.get('bids') and book.get('asks')):
+            raise ValueError(f"Could not retrieve order book for {self.symbol}")
+        return OrderBook(self.name, _levels(book['bids']), _levels(book['asks']))
+
+    def ws_subscribe(self):
+        return [{"op": "sub", "id": "caw", "ch": f"bbo:{self.symbol}"}]
+
+    def ws_reply(self, message):
+        return {"op": "pong"} if message.get("m") == "ping" else None
+
+    def parse_ws(self, message):
+        if message.get("m") != "bbo":
+            return None
+        data = message["data"]
+        return Quote(self.name, to_price(data["bid"][0]), to_price(data["ask"][0]))
+
+@register_adapter("cryptocom")
+class CryptoComAdapter(ExchangeAdapter):
+    name = "Crypto.com"
+    base_url = "https://api.crypto.com/v2"
+    ws_url = "wss://stream.crypto.com/exchange/v1/market"
+    ws_warmup = 1  # Crypto.com asks clients to wait 1s before the first request
+
+    def ticker_url(self):
+        return f"{self.base_url}/public/get-ticker?instrument_name={self.symbol}"
+
+    def parse_ticker(self, data):
+        result = (data or {}).get('result') or {}
+        if not result.get('data'):
+            raise ValueError(f"Could not retrieve ticker data for {self.symbol}")
+        ticker_info = result['data'][0]
+        # v2 ticker: `b` best bid, `k` best ask (`a` is the last trade price)
+        return Quote(self.name, to_price(ticker_info.get('b')), to_price(ticker_info.get('k')))
+
+    def depth_url(self):
+        return f"{self.base_url}/public/get-book?instrument_name={self.symbol}&depth={ORDER_BOOK_DEPTH}"
+
+    def parse_depth(self, data):
+        result = (data or {}).get('result') or {}
+        book = (result.get('data') or [{}])[0]
+        if not (book.get('bids') and book.get('asks')):
+            raise ValueError(f"Could not retrieve order book for {self.symbol}")
+        return OrderBook(self.name, _levels(book['bids']), _levels(book['asks']))  # Levels are [price, qty, orders]
+
+    def ws_subscribe(self):
+        return [{"id": 1, "method": "subscribe", "params": {"channels": [f"ticker.{self.symbol}"]}, "nonce": int(time.time() * 1000)}]
+
+    def ws_reply(self, message):
+        if message.get("method") == "public/heartbeat":
+            return {"id": message.get("id"), "method": "public/respond-heartbeat"}
+        return None
+
+    def parse_ws(self, message):
+        result = message.get("result") or {}
+        if result.get("channel") != "ticker" or not result.get("data"):
+            return None
+        ticker_info = result["data"][-1]
+        return Quote(self.name, to_price(ticker_info.get('b')), to_price(ticker_info.get('k')))
+
+def build_venues(venues=EXCHANGE_VENUES):
+    """Instantiates the adapters listed in config.EXCHANGE_VENUES, in display order."""
+    return [ADAPTERS[key](symbol) for key, symbol in venues]
+
+VENUES = build_venues()
+
+async def _fetch_venue(adapter, source, fetch):
+    """Fetches one venue through the `source` cache, turning every failure into an error message."""
+    try:
+        result = await get_cache(source).get_or_fetch((adapter.name, adapter.symbol), fetch)
+        return result, None
+    except asyncio.TimeoutError:
+        return None, f"Timed out after {EXCHANGE_TIMEOUT:g}s"
+    except aiohttp.ClientError as e:
+        return None, f"API request error: {e}"
+    except json.JSONDecodeError as e:
+        return None, f"JSON decoding error: {e}"
+    except ValueError as e:
+        return None, str(e)
+    except Exception as e:
+        return None, f"An unexpected error occurred: {e}"
+
+async def _fetch_venue_or_last_good(adapter, source, fetch):
+    """Like _fetch_venue, but a failed venue answers with its last good Quote (at most STALE_MAX_AGE
+    seconds old), marked stale, alongside the error."""
+    result, error = await _fetch_venue(adapter, source, fetch)
+    if result is None:
+        last_good = get_cache(source).get_stale((adapter.name, adapter.symbol), STALE_MAX_AGE)
+        if last_good is not None:
+            result = replace(last_good, stale=True)
+    return result, error
+
+async def _fetch_all(venues, source, method, fetch_venue=_fetch_venue):
+    """Runs `method` on every venue concurrently.
+
+    Returns (results, errors): dicts keyed by exchange name. Venues still running at
+    EXCHANGE_DEADLINE are cancelled and reported as errors.
+    """
+    venues = VENUES if venues is None else venues
+    tasks = {adapter.name: asyncio.create_task(fetch_venue(adapter, source, getattr(adapter, method))) for adapter in venues}
+    done, pending = await asyncio.wait(tasks.values(), timeout=EXCHANGE_DEADLINE)
+    for task in pending:
+        task.cancel()
+
+    results, errors = {}, {}
+    for name, task in tasks.items():
+        if task not in done:
+            errors[name] = f"Missed the {EXCHANGE_DEADLINE:g}s deadline"
+            continue
+        result, error = task.result()
+        if result is not None:
+            results[name] = result
+        if error is not None:
+            errors[name] = error
+    return results, errors
+
+async def fetch_quotes(venues=None, last_good=False):
+    """Top-of-book Quotes for every venue: (quotes, errors) keyed by exchange name.
+
+    With `last_good`, a failed venue is in both: its error, and its last good Quote marked stale.
+    """
+    return await _fetch_all(venues, "exchange", "fetch_quote", _fetch_venue_or_last_good if last_good else _fetch_venue)
+
+async def fetch_books(venues=None):
+    """L2 OrderBooks for every venue: (books, errors) keyed by exchange name."""
+    return await _fetch_all(venues, "depth", "fetch_depth")
@@ -0,0 +1,37 @@
+# Format numbers for display with commas
+def format_large_number(value):
+    if value >= 1_000_000_000_000:
+        return f"{value / 1_000_000_000_000:.2f}T".replace(",", "")  # Trillions
+    elif value >= 1_000_000_000:
+        return f"{value / 1_000_000_000:.2f}B".replace(",", "")  # Billions
+    elif value >= 1_000_000:
+        return f"{value / 1_000_000:.2f}M".replace(",", "")  # Millions
+    else:
+        return f"{value:,.2f}"  # Numbers under a million with commas
+
+# 📌 Format a USD price, keeping significant digits for sub-cent coins
+def format_price(value):
+    if value >= 1:
+        return f"${value:,.2f}"
+    return f"${value:.10f}".rstrip("0")
+
+# 📌 Format a balance that may be unknown (failed fetch)
+def format_balance(value):
+    return "unknown" if value is None else format_large_number(value)
+
+# 📌 Format an age in seconds as the largest whole unit, e.g. 45s, 12m, 3h, 2d
+def format_age(seconds):
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size:
+            return f"{seconds // size:.0f}{unit}"
+    return f"{seconds:.0f}s"
+
+# 📌 Format number to Billions (B)
+def format_billions(value):
+    return f"{value / 1_000_000_000:.2f} B"
+
+# 📌 Format a signed change, with its percentage when known
+def format_change(delta, pct):
+    sign = "+" if delta >= 0 else "-"
+    change = f"{sign}{format_large_number(abs(delta))}"
+    return f"{change}, {pct:+.2f}%" if pct is not None else change
@@ -1,46 +1,96 @@
-import requests
-import os 
-from config import CAW_CONTRACT_ADDRESS, CAW_ADDRESSES
-
-API_KEY_CRONOSCAN = os.getenv("API_KEY_CRONOSCAN")  # CoinMarketCap API Key
-
-DECIMALS = 18
-TOTAL_SUPPLY = 777_777_777_777_777  # 777.777 Trillion CAW
-
-# Define address titles (last one is Burn)
-ADDRESS_TITLES = [
-    "3DA3",
-    "677F",
-    "825B",
-    "Burn"
-]
-
-def get_token_balance(address):
-    api_url = f"https://api.cronoscan.com/api?module=account&action=tokenbalance&contractaddress={CAW_CONTRACT_ADDRESS}&address={address}&tag=latest&apikey={API_KEY_CRONOSCAN}"
-    try:
-        response = requests.get(api_url)
-        response.raise_for_status()
-        data = response.json()
-        if data["status"] == "1":
-            return int(data["result"]) / 10**DECIMALS
-        else:
-            print(f"Error fetching balance for {address}: {data['message']}")
-            return 0  # Return 0 to avoid sum errors
-    except requests.exceptions.RequestException as e:
-        print(f"Request error: {e}")
-        return 0  # Return 0 to handle errors smoothly
+import asyncio
+import os
+import aiohttp
+from config import CRONOS_RPC_URL, RPC_BATCH_MAX, BALANCE_CONCURRENCY, BALANCE_TIMEOUT, BALANCE_RETRIES, BALANCE_BACKOFF
+from upstream import get_json, post_json
+from health import UpstreamUnavailable, describe
+from amounts import from_wei
+
+API_KEY_CRONOSCAN = os.getenv("API_KEY_CRONOSCAN")  # Cronoscan API Key
+
+# ERC-20 balanceOf(address) selector
+BALANCE_OF = "0x70a08231"
+
+class RateLimited(Exception):
+    pass
 
-def get_caw_balances():
-    balances = [get_token_balance(addr) for addr in CAW_ADDRESSES]
+def _is_rate_limited(data):
+    return "rate limit" in str(data.get("result", "")).lower() or "rate limit" in str(data.get("message", "")).lower()
 
-    # Separate Burn balance
-    burn_balance = balances[-1]  # Last address (Burn)
-    cdc_balances = balances[:-1]  # All except Burn
+async def _fetch_token_balance(contract, address):
+    api_url = f"https://api.cronoscan.com/api?module=account&action=tokenbalance&contractaddress={contract}&address={address}&tag=latest&apikey={API_KEY_CRONOSCAN}"
+    data = await get_json(api_url, BALANCE_TIMEOUT)
+    if data["status"] == "1":
+        return int(data["result"])  # Integer base units (wei), converted only once summed
+    if _is_rate_limited(data):
+        raise RateLimited(data.get("result"))
+    raise ValueError(data.get("message"))
 
-    # Sum only CDC balances (exclude Burn)
-    cdc_total = sum(cdc_balances)
+async def get_token_balance(contract, address, semaphore=None):
+    """Cronoscan tokenbalance of `address` in wei, or None if it couldn't be fetched (never a made-up 0)."""
+    semaphore = semaphore or asyncio.Semaphore(1)
+    delay = BALANCE_BACKOFF
+    for attempt in range(BALANCE_RETRIES + 1):
+        async with semaphore:
+            try:
+                return await _fetch_token_balance(contract, address)
+            except RateLimited as e:
+                error = f"rate limited ({e})"
+            except asyncio.TimeoutError:
+                error = f"timed out after {BALANCE_TIMEOUT:g}s"
+            except UpstreamUnavailable as e:
+                print(f"Error fetching balance for {address}: {e}")
+                return None  # Retrying can't get past an open breaker
+            except aiohttp.ClientError as e:
+                error = f"request error: {describe(e)}"
+            except (KeyError, ValueError) as e:
+                print(f"Error fetching balance for {address}: {e}")
+                return None  # Not worth retrying
+        if attempt < BALANCE_RETRIES:
+            await asyncio.sleep(delay)  # Back off outside the semaphore so other addresses keep going
+            delay *= 2
+    print(f"Error fetching balance for {address}: {error}")
+    return None
 
-    # Calculate percentage from total supply
-    cdc_percentage = (cdc_total / TOTAL_SUPPLY) * 100
+async def _fetch_batch(pairs):
+    """balanceOf for every (Token, Wallet) pair in one JSON-RPC batch request; wei, or None where the call failed."""
+    replies = await post_json(CRONOS_RPC_URL, BALANCE_TIMEOUT, [
+        {"jsonrpc": "2.0", "id": index, "method": "eth_call",
+         "params": [{"to": token.contract, "data": BALANCE_OF + wallet.address[2:].rjust(64, "0")}, "latest"]}
+        for index, (token, wallet) in enumerate(pairs)
+    ])
+    if not isinstance(replies, list):  # The node rejected the whole batch
+        raise ValueError(replies.get("error") if isinstance(replies, dict) else replies)
+    results = {reply.get("id"): reply.get("result") for reply in replies}
+    return [int(results[index], 16) if results.get(index) not in (None, "0x") else None for index in range(len(pairs))]
+
+async def get_balances(pairs):
+    """{(symbol, address): exact Decimal balance, or None if unknown} for (Token, Wallet) pairs.
+
+    Balances are read in JSON-RPC batches of up to RPC_BATCH_MAX balanceOf calls, all sent at once,
+    so tracking more tokens and wallets adds batch size rather than round trips. Pairs of a batch
+    that failed, or whose own call in the batch failed, are fetched again one by one from Cronoscan
+    (at most BALANCE_CONCURRENCY in flight).
+    """
+    batches = [pairs[start:start + RPC_BATCH_MAX] for start in range(0, len(pairs), RPC_BATCH_MAX)]
+    results = await asyncio.gather(*(_fetch_batch(batch) for batch in batches), return_exceptions=True)
+
+    wei, failed = {}, []
+    for batch, result in zip(batches, results):
+        if isinstance(result, (asyncio.TimeoutError, aiohttp.ClientError, AttributeError, KeyError, ValueError)):
+            print(f"Balance batch failed, using Cronoscan tokenbalance instead: {describe(result)}")
+            failed.extend(batch)
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            for pair, amount in zip(batch, result):
+                if amount is None:  # That one call failed (e.g. rate limited) inside an otherwise good batch
+                    failed.append(pair)
+                else:
+                    wei[pair] = amount
 
-    return cdc_balances, burn_balance, cdc_total, cdc_percentage
+    semaphore = asyncio.Semaphore(BALANCE_CONCURRENCY)
+    fallback = await asyncio.gather(*(get_token_balance(token.contract, wallet.address, semaphore) for token, wallet in failed))
+    wei.update(zip(failed, fallback))
+    return {(token.symbol, wallet.address): None if amount is None else from_wei(amount, token.decimals)
+            for (token, wallet), amount in wei.items()}
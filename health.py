@@ -0,0 +1,140 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+import aiohttp
+from config import BREAKER_FAILURES, BREAKER_COOLDOWN
+
+# 📌 Breaker states, also the value of the upstream_breaker_state gauge
+CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+STATE_NAMES = {CLOSED: "closed", HALF_OPEN: "half-open", OPEN: "open"}
+
+class UpstreamUnavailable(aiohttp.ClientError):
+    """Raised instead of calling an upstream whose breaker is open.
+
+    A ClientError, so every caller already handling request errors fails fast the same way.
+    """
+
+# Called with (api, UpstreamUnavailable) whenever a breaker opens
+OPEN_LISTENERS = []
+
+def _is_failure(error):
+    """Whether `error` says the upstream itself is unhealthy: timeouts, dropped connections and 5xx.
+    429s and other 4xx are answers from a working API and don't count."""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status >= 500
+    return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError))
+
+def describe(error):
+    """Short reason for logs and !stats, without the request URL (it may carry an API key)."""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return f"HTTP {error.status} {error.message}"
+    if isinstance(error, aiohttp.InvalidURL):
+        return type(error).__name__
+    return str(error) or type(error).__name__
+
+class CircuitBreaker:
+    """Health of one upstream API.
+
+    Closed: calls go through. After BREAKER_FAILURES consecutive failures it opens and calls fail
+    at once with UpstreamUnavailable. Once BREAKER_COOLDOWN seconds have passed it is half-open:
+    the next call goes through as a probe (the others still fail fast) and closes the breaker if
+    it succeeds, or opens it for another cooldown if it fails.
+    """
+
+    def __init__(self, api, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.api = api
+        self.failures = failures
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None  # monotonic
+        self.trips = 0
+        self.last_error = None
+        self._probing = False
+
+    def before_call(self):
+        """Raises UpstreamUnavailable unless a call may go through now; returns whether it is the probe."""
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = HALF_OPEN
+        if self.state == CLOSED:
+            return False
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        raise self._unavailable()
+
+    def _unavailable(self):
+        retry_in = max(0.0, self.opened_at + self.cooldown - time.monotonic())
+        return UpstreamUnavailable(f"{self.api} is unavailable ({self.last_error}), retrying in {retry_in:.0f}s")
+
+    def record_success(self):
+        if self.state != CLOSED:
+            print(f"Upstream {self.api} recovered")
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._probing = False
+
+    def record_failure(self, error):
+        self.consecutive_failures += 1
+        self.last_error = describe(error)
+        self._probing = False
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failures:
+            if self.state == CLOSED:
+                self.trips += 1
+                print(f"Upstream {self.api} failing ({self.last_error}), failing fast for {self.cooldown:g}s")
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            for callback in OPEN_LISTENERS:
+                callback(self.api, self._unavailable())
+
+    def release(self):
+        """Gives up the probe slot without a verdict (the call was cancelled)."""
+        self._probing = False
+
+    def stats(self):
+        return {"state": STATE_NAMES[self.state], "consecutive_failures": self.consecutive_failures,
+                "trips": self.trips, "last_error": self.last_error}
+
+# 📌 One breaker per upstream API, created on first use
+_breakers = {}
+
+def get_breaker(api):
+    if api not in _breakers:
+        _breakers[api] = CircuitBreaker(api)
+    return _breakers[api]
+
+@asynccontextmanager
+async def guarded(api, wait_turn=None):
+    """Runs the body as one call to `api` through its breaker.
+
+    `wait_turn()` is awaited first to queue for the API's rate limit. The breaker is checked before
+    and after, and OPEN_LISTENERS fail calls still queued when it opens, so none of them go out.
+    """
+    breaker = get_breaker(api)
+    probe = breaker.before_call()
+    if wait_turn is not None:
+        try:
+            await wait_turn()
+        except BaseException:
+            if probe:
+                breaker.release()
+            raise
+        if not probe:
+            breaker.before_call()
+    try:
+        yield
+    except Exception as e:
+        if _is_failure(e):
+            breaker.record_failure(e)
+        else:
+            breaker.record_success()  # The API answered, the request was the problem
+        raise
+    except BaseException:
+        breaker.release()
+        raise
+    else:
+        breaker.record_success()
+
+def breaker_stats():
+    """State and counters of every breaker created so far, keyed by API."""
+    return {api: breaker.stats() for api, breaker in _breakers.items()}
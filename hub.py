@@ -0,0 +1,204 @@
+import asyncio
+import threading
+from dataclasses import replace
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.managers import BaseManager
+from config import BOT_ROLE, CDC_SNAPSHOT_INTERVAL, DEPTH_REFRESH_INTERVAL, EXCHANGE_STREAMING, TRANSFER_INDEXING, HUB_ADDRESS, HUB_AUTHKEY, HUB_CALL_TIMEOUT, MATH_PROCESSES, TAKER_FEES
+from arbitrage import size_opportunities
+from exchanges import QUOTE_LISTENERS, VENUES, fetch_books, fetch_quotes
+from market_data import stream
+from alerts import AlertWatcher, poll_quotes_forever
+from ticks import recorder
+from snapshots import latest_snapshot, take_snapshot, collect_snapshots_forever
+from cmc import get_coin_quote, refresh_symbol_index_forever
+from scheduler import interactive
+from transfers import indexer
+
+class Hub:
+    """Owns every upstream poller and answers the commands' data needs in this process.
+
+    A standalone bot uses it directly. In multi-process mode only the hub process runs one,
+    and shards reach it through HubClient, so upstream load doesn't grow with the shard count.
+    """
+
+    def __init__(self):
+        self.alert_watcher = None
+        self._tasks = []
+        self._math_pool = None
+        # Streaming mode: (sized opportunities, order book errors) from the last background refresh
+        self._depth = ([], {adapter.name: "Waiting for the first order book refresh" for adapter in VENUES})
+
+    async def start(self, send_alert):
+        """Starts the pollers; `send_alert(channel_id, message)` posts arbitrage alerts.
+
+        The alert subscriptions are loaded first (waiting for the database if need be), so nothing
+        is left running, and nothing has to be stopped, if that never succeeds.
+        """
+        self.alert_watcher = AlertWatcher(send_alert)
+        await self._load_alerts()
+        if MATH_PROCESSES:
+            self._math_pool = ProcessPoolExecutor(max_workers=MATH_PROCESSES)
+        self._tasks += [
+            asyncio.create_task(refresh_symbol_index_forever()),
+            asyncio.create_task(collect_snapshots_forever()),
+            asyncio.create_task(recorder.flush_forever()),
+        ]
+        if TRANSFER_INDEXING:
+            self._tasks.append(asyncio.create_task(indexer.run_forever()))
+        QUOTE_LISTENERS.append(recorder.record)
+        stream.add_listener(recorder.record)
+        if EXCHANGE_STREAMING:
+            stream.add_listener(self.alert_watcher.on_quote)
+            stream.start()
+            self._tasks.append(asyncio.create_task(self._refresh_depth_forever()))
+        else:
+            self._tasks.append(asyncio.create_task(poll_quotes_forever(self.alert_watcher, fetch_quotes)))
+
+    async def _load_alerts(self):
+        delay = 1
+        while True:
+            try:
+                await self.alert_watcher.load()
+                return
+            except Exception as e:
+                print(f"Could not load arbitrage alert subscriptions ({e}), retrying in {delay:g}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        await stream.stop()
+        if recorder.record in QUOTE_LISTENERS:
+            QUOTE_LISTENERS.remove(recorder.record)
+        stream.remove_listener(recorder.record)
+        if self.alert_watcher is not None:
+            stream.remove_listener(self.alert_watcher.on_quote)
+        await recorder.flush()
+        if self._math_pool is not None:
+            self._math_pool.shutdown(cancel_futures=True)
+            self._math_pool = None
+
+    async def _size(self, books):
+        if self._math_pool is not None:
+            return await asyncio.get_running_loop().run_in_executor(self._math_pool, size_opportunities, books, TAKER_FEES)
+        return size_opportunities(books, TAKER_FEES)
+
+    async def _refresh_depth_forever(self):
+        """Streaming mode: re-sizes arbitrage from REST order books every DEPTH_REFRESH_INTERVAL seconds,
+        so !ex keeps answering from memory."""
+        while True:
+            try:
+                books, book_errors = await fetch_books()
+                self._depth = (await self._size(books), book_errors)
+            except Exception as e:
+                print(f"Order book refresh failed: {e}")
+            await asyncio.sleep(DEPTH_REFRESH_INTERVAL)
+
+    # 📌 Data calls, also served to shards (arguments and results must pickle)
+
+    async def market(self):
+        """(quotes, errors, sized opportunities, order book errors) for !ex."""
+        if EXCHANGE_STREAMING:
+            return (*stream.quotes(), *self._depth)
+        (quotes, errors), (books, book_errors) = await asyncio.gather(fetch_quotes(last_good=True), fetch_books())
+        return quotes, errors, await self._size(books), book_errors
+
+    async def coin_quote(self, symbol):
+        return await get_coin_quote(symbol)
+
+    async def snapshot(self, symbol, fresh=False):
+        """Latest complete snapshot of `symbol`, or a live one when `fresh` or nothing was recorded yet;
+        None if the token isn't tracked.
+
+        A live snapshot missing balances gives way to the latest recorded one, marked stale. So does
+        a recorded one when background snapshots have been failing for more than an interval.
+        """
+        if fresh and TRANSFER_INDEXING:
+            await indexer.sync()  # Catch the index up to the chain head first
+        snapshot = None if fresh else await latest_snapshot(symbol)
+        if snapshot is not None:
+            return replace(snapshot, stale=True) if snapshot.age > 2 * CDC_SNAPSHOT_INTERVAL else snapshot
+        snapshot = (await take_snapshot()).get(symbol.upper())
+        if snapshot is not None and not snapshot.complete:
+            last_good = await latest_snapshot(symbol)
+            if last_good is not None:
+                return replace(last_good, stale=True)
+        return snapshot
+
+    async def spread_slots(self, minutes, slot_count):
+        return await recorder.slots(minutes, slot_count)
+
+    async def alert_add(self, channel_id, guild_id, threshold, user_id):
+        await self.alert_watcher.add(channel_id, guild_id, threshold, user_id)
+
+    async def alert_remove(self, channel_id, threshold=None):
+        return await self.alert_watcher.remove(channel_id, threshold)
+
+    async def alert_thresholds(self, channel_id):
+        return self.alert_watcher.channel_thresholds(channel_id)
+
+# 📌 Calls a shard may make, resolved on the Hub instance
+HUB_CALLS = {"market", "coin_quote", "snapshot", "spread_slots", "alert_add", "alert_remove", "alert_thresholds"}
+
+class _Dispatcher:
+    """Runs a shard's call on the hub's event loop, at user-command priority; lives in the manager's server threads."""
+
+    def __init__(self, hub, loop):
+        self.hub = hub
+        self.loop = loop
+
+    def call(self, name, args):
+        if name not in HUB_CALLS:
+            raise AttributeError(f"Unknown hub call: {name}")
+        future = asyncio.run_coroutine_threadsafe(interactive(getattr(self.hub, name)(*args)), self.loop)
+        return future.result(HUB_CALL_TIMEOUT)
+
+class HubManager(BaseManager):
+    pass
+
+def _manager():
+    # The manager unpickles whatever it receives, so it must never listen (or connect) without a key
+    if not HUB_AUTHKEY:
+        raise RuntimeError("HUB_AUTHKEY must be set for the hub and shard roles")
+    return HubManager(address=HUB_ADDRESS, authkey=HUB_AUTHKEY)
+
+def serve(hub, loop):
+    """Serves `hub` to the shards on HUB_ADDRESS from a background thread."""
+    dispatcher = _Dispatcher(hub, loop)
+    HubManager.register("hub", callable=lambda: dispatcher, exposed=("call",))
+    server = _manager().get_server()
+    threading.Thread(target=server.serve_forever, name="hub", daemon=True).start()
+    return server
+
+class HubClient:
+    """Same data calls as Hub, forwarded to the hub process.
+
+    Manager proxies block, so each call runs in a worker thread (the proxy keeps one
+    connection per thread). Exceptions raised in the hub are re-raised here.
+    """
+
+    def __init__(self):
+        self._proxy = None
+        self._lock = threading.Lock()
+
+    def _call(self, name, args):
+        with self._lock:
+            if self._proxy is None:
+                HubManager.register("hub")
+                manager = _manager()
+                manager.connect()
+                self._proxy = manager.hub()
+        return self._proxy.call(name, args)
+
+    def __getattr__(self, name):
+        if name not in HUB_CALLS:
+            raise AttributeError(name)
+
+        async def call(*args):
+            return await asyncio.to_thread(self._call, name, args)
+        return call
+
+# Shards forward to the hub process; everyone else owns the pollers
+service = HubClient() if BOT_ROLE == "shard" else Hub()
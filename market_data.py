@@ -0,0 +1,95 @@
+import asyncio
+import json
+from decimal import Decimal
+import aiohttp
+from config import EXCHANGE_STREAM_MAX_AGE, EXCHANGE_STREAM_MAX_BACKOFF
+from exchanges import VENUES
+from upstream import get_session
+
+def _loads(data):
+    return json.loads(data, parse_float=Decimal)
+
+class MarketDataStream:
+    """Long-lived WebSocket subscriptions keeping the latest best bid/ask per venue in memory."""
+
+    def __init__(self, venues=None):
+        self.venues = VENUES if venues is None else venues
+        self._quotes = {}  # exchange name -> Quote
+        self._status = {}  # exchange name -> last connection error
+        self._listeners = []
+        self._tasks = []
+
+    def add_listener(self, callback):
+        """Calls `callback(quote)` on every quote update."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._run_venue(adapter)) for adapter in self.venues if adapter.ws_url]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def quotes(self, max_age=EXCHANGE_STREAM_MAX_AGE):
+        """Same (quotes, errors) shape as exchanges.fetch_quotes(), answered from memory."""
+        quotes, errors = {}, {}
+        for adapter in self.venues:
+            quote = self._quotes.get(adapter.name)
+            if quote is not None and quote.age <= max_age:
+                quotes[adapter.name] = quote
+            elif quote is not None:
+                errors[adapter.name] = f"Stale quote ({quote.age:.0f}s old)"
+            else:
+                errors[adapter.name] = self._status.get(adapter.name, "Waiting for the first stream update")
+        return quotes, errors
+
+    async def _run_venue(self, adapter):
+        delay = 1
+        while True:
+            last_quote = self._quotes.get(adapter.name)
+            try:
+                await self._consume(adapter)
+                self._status[adapter.name] = "Stream closed"
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, KeyError) as e:
+                self._status[adapter.name] = f"Stream error: {e}"
+            except Exception as e:  # A frame we can't read must not end the venue's stream for good
+                self._status[adapter.name] = f"Stream error: {e!r}"
+            if self._quotes.get(adapter.name) is not last_quote:
+                delay = 1  # The session delivered updates, so start the backoff over
+            print(f"{adapter.name} stream: {self._status[adapter.name]}, reconnecting in {delay:g}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, EXCHANGE_STREAM_MAX_BACKOFF)
+
+    async def _consume(self, adapter):
+        async with get_session().ws_connect(adapter.stream_url(), heartbeat=20) as ws:
+            if adapter.ws_warmup:
+                await asyncio.sleep(adapter.ws_warmup)
+            for message in adapter.ws_subscribe():
+                await ws.send_json(message)
+            async for frame in ws:
+                if frame.type != aiohttp.WSMsgType.TEXT:
+                    if frame.type == aiohttp.WSMsgType.ERROR:
+                        raise aiohttp.ClientError(ws.exception())
+                    continue
+                message = _loads(frame.data)
+                reply = adapter.ws_reply(message)
+                if reply is not None:
+                    await ws.send_json(reply)
+                    continue
+                quote = adapter.parse_ws(message)
+                if quote is not None:
+                    self._quotes[adapter.name] = quote
+                    self._status.pop(adapter.name, None)
+                    for callback in self._listeners:
+                        try:
+                            callback(quote)
+                        except Exception as e:  # One broken listener shouldn't drop the connection
+                            print(f"{adapter.name} stream listener {callback!r} failed: {e!r}")
+
+stream = MarketDataStream()
@@ -0,0 +1,136 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+import aiohttp
+from cache import cache_stats
+from health import STATE_NAMES, breaker_stats
+
+# Latency buckets in seconds (upper bounds)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float("inf"))
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (what Prometheus would interpolate from)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return BUCKETS[-1]
+
+# (metric name, label name, label value) -> Histogram
+HISTOGRAMS = {}
+
+HELP = {
+    "bot_command_seconds": "Discord command latency",
+    "upstream_request_seconds": "HTTP request latency per upstream host",
+    "upstream_queue_seconds": "Time a request waited for its API's rate limit",
+    "db_query_seconds": "Database query latency, including pool wait",
+    "event_loop_lag_seconds": "Delay of a periodic event loop wake-up",
+    "bot_startup_seconds": "Process start to the first gateway READY",
+}
+
+def observe(name, seconds, label=None, value=None):
+    key = (name, label, value)
+    histogram = HISTOGRAMS.get(key)
+    if histogram is None:
+        histogram = HISTOGRAMS[key] = Histogram()
+    histogram.observe(seconds)
+
+@contextmanager
+def timed(name, label=None, value=None):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, label, value)
+
+def http_trace_config():
+    """aiohttp tracing hooks that time every request on the shared session per host."""
+    async def on_start(session, ctx, params):
+        ctx.start = time.perf_counter()
+
+    async def on_end(session, ctx, params):
+        observe("upstream_request_seconds", time.perf_counter() - ctx.start, "host", urlsplit(str(params.url)).hostname)
+
+    config = aiohttp.TraceConfig()
+    config.on_request_start.append(on_start)
+    config.on_request_end.append(on_end)
+    config.on_request_exception.append(on_end)
+    return config
+
+async def watch_event_loop_lag(interval=0.5):
+    """Background task: how late the loop wakes up from a fixed sleep."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        observe("event_loop_lag_seconds", max(0.0, loop.time() - start - interval))
+
+def _labels(label, value, extra=""):
+    parts = [f'{label}="{value}"'] if label else []
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def render():
+    """Prometheus text exposition of every histogram, the quote cache counters and the upstream breakers."""
+    lines = []
+    for name in sorted({key[0] for key in HISTOGRAMS}):
+        lines.append(f"# HELP {name} {HELP.get(name, name)}")
+        lines.append(f"# TYPE {name} histogram")
+        for (metric, label, value), histogram in sorted(HISTOGRAMS.items(), key=lambda item: str(item[0])):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, n in zip(BUCKETS, histogram.counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                bucket_labels = _labels(label, value, f'le="{le}"')
+                lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{name}_sum{_labels(label, value)} {histogram.sum:.6f}")
+            lines.append(f"{name}_count{_labels(label, value)} {histogram.count}")
+    for counter in ("hits", "misses", "coalesced"):
+        lines.append(f"# TYPE quote_cache_{counter}_total counter")
+        for source, stats in cache_stats().items():
+            lines.append(f'quote_cache_{counter}_total{{source="{source}"}} {stats[counter]}')
+    states = {name: state for state, name in STATE_NAMES.items()}
+    lines.append("# HELP upstream_breaker_state Circuit breaker per upstream API: 0 closed, 1 half-open, 2 open")
+    lines.append("# TYPE upstream_breaker_state gauge")
+    for api, stats in breaker_stats().items():
+        lines.append(f'upstream_breaker_state{{api="{api}"}} {states[stats["state"]]}')
+    lines.append("# TYPE upstream_breaker_trips_total counter")
+    for api, stats in breaker_stats().items():
+        lines.append(f'upstream_breaker_trips_total{{api="{api}"}} {stats["trips"]}')
+    return "\n".join(lines) + "\n"
+
+async def start_server(host, port):
+    """Serves /metrics; returns the runner so it can be cleaned up on shutdown."""
+    from aiohttp import web  # Only needed once the bot is up, keep it off the startup path
+
+    async def metrics_handler(request):
+        return web.Response(text=render(), content_type="text/plain")
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
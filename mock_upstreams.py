@@ -0,0 +1,149 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+from aiohttp import web
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def load_frames(fixtures_dir, venue):
+    with open(os.path.join(fixtures_dir, "ws", f"{venue}.jsonl")) as f:
+        return [line.strip() for line in f if line.strip()]
+
+async def replay_ws(request):
+    """Waits for the client's subscribe message, then replays the venue's recorded frames."""
+    settings = request.app["settings"]
+    try:
+        frames = load_frames(settings["fixtures_dir"], request.match_info["venue"])
+    except OSError:
+        raise web.HTTPNotFound()
+
+    ws = web.WebSocketResponse()
+    await ws.prepare(request)
+    await ws.receive()  # Subscribe request
+    try:
+        while not ws.closed:
+            for frame in frames:
+                await ws.send_str(frame)
+                await asyncio.sleep(settings["interval"])
+            if not settings["loop"]:
+                break
+    except ConnectionResetError:
+        pass  # Client went away
+    await ws.close()
+    return ws
+
+def cronoscan(recorded, query):
+    """Recorded tokenbalance, or a tokentx page between `startblock` and `endblock`, for the requested address."""
+    address = query.get("address", "").lower()
+    if query.get("action") == "tokentx":
+        start_block, end_block = int(query.get("startblock", 0)), int(query.get("endblock", 999_999_999))
+        offset, page = int(query.get("offset", 10000)), int(query.get("page", 1))
+        transfers = [transfer for transfer in recorded["tokentx"].get(address, [])
+                     if start_block <= int(transfer["blockNumber"]) <= end_block][(page - 1) * offset:page * offset]
+        if not transfers:
+            return {"status": "0", "message": "No transactions found", "result": []}
+        return {"status": "1", "message": "OK", "result": transfers}
+    return recorded["tokenbalance"].get(address, {"status": "0", "message": "NOTOK", "result": "Error! Invalid address format"})
+
+def cmc_quotes(recorded, query):
+    """Recorded quotes/latest response cut down to the requested ids or symbols, keyed the way CMC keys them."""
+    data = recorded["data"]
+    if "id" in query:
+        selected = {coin_id: data[coin_id] for coin_id in query["id"].split(",") if coin_id in data}
+    else:
+        symbols = set(query.get("symbol", "").upper().split(","))
+        selected = {coin["symbol"]: coin for coin in data.values() if coin["symbol"] in symbols}
+    return {**recorded, "data": selected}
+
+# 📌 (host, path) -> (fixture file, how to answer from it); None replays the file as is
+HTTP_FIXTURES = {
+    ("api.gateio.ws", "/api/v4/spot/tickers"): ("gateio_ticker.json", None),
+    ("api.gateio.ws", "/api/v4/spot/order_book"): ("gateio_depth.json", None),
+    ("ascendex.com", "/api/pro/v1/spot/ticker"): ("ascendex_ticker.json", None),
+    ("ascendex.com", "/api/pro/v1/depth"): ("ascendex_depth.json", None),
+    ("api.crypto.com", "/v2/public/get-ticker"): ("cryptocom_ticker.json", None),
+    ("api.crypto.com", "/v2/public/get-book"): ("cryptocom_depth.json", None),
+    ("api.cronoscan.com", "/api"): ("cronoscan.json", cronoscan),
+    ("pro-api.coinmarketcap.com", "/v1/cryptocurrency/map"): ("cmc_map.json", None),
+    ("pro-api.coinmarketcap.com", "/v1/cryptocurrency/quotes/latest"): ("cmc_quotes.json", cmc_quotes),
+}
+
+# Host of the default CRONOS_RPC_URL, answered by replay_rpc
+RPC_HOST = "evm.cronos.org"
+
+async def _delay_or_fail(settings):
+    """The configured latency, then an injected error response or None."""
+    await asyncio.sleep(settings["latency"] + random.uniform(0, settings["jitter"]))
+    if random.random() < settings["error_rate"]:
+        return web.Response(status=settings["error_status"], text="Injected error")
+    return None
+
+def _recorded(app, filename):
+    recorded = app["recorded"].get(filename)
+    if recorded is None:
+        with open(os.path.join(app["settings"]["fixtures_dir"], filename)) as f:
+            recorded = app["recorded"][filename] = json.load(f)
+    return recorded
+
+async def replay_http(request):
+    """Answers /http/<host>/<path> from the recorded response, after the configured latency or error."""
+    host, path = request.match_info["host"], "/" + request.match_info["path"]
+    if (host, path) not in HTTP_FIXTURES:
+        raise web.HTTPNotFound()
+    filename, respond = HTTP_FIXTURES[(host, path)]
+    error = await _delay_or_fail(request.app["settings"])
+    if error is not None:
+        return error
+    recorded = _recorded(request.app, filename)
+    return web.json_response(respond(recorded, request.query) if respond else recorded)
+
+def _rpc_result(recorded, call):
+    """eth_call balanceOf(address) answered with the recorded tokenbalance of the address, whatever the contract."""
+    data = call.get("params", [{}])[0].get("data", "")
+    if call.get("method") != "eth_call" or not data.startswith("0x70a08231"):
+        return {"jsonrpc": "2.0", "id": call.get("id"), "error": {"code": -32601, "message": "Method not found"}}
+    balance = recorded["tokenbalance"].get("0x" + data[-40:], {"result": "0"})["result"]
+    return {"jsonrpc": "2.0", "id": call.get("id"), "result": hex(int(balance))}
+
+async def replay_rpc(request):
+    """Answers JSON-RPC POSTs to /http/<node host>/, single or batched, after the configured latency or error."""
+    if (request.match_info["host"], "/" + request.match_info["path"]) != (RPC_HOST, "/"):
+        raise web.HTTPNotFound()
+    error = await _delay_or_fail(request.app["settings"])
+    if error is not None:
+        return error
+    recorded, payload = _recorded(request.app, "cronoscan.json"), await request.json()
+    if isinstance(payload, list):
+        return web.json_response([_rpc_result(recorded, call) for call in payload])
+    return web.json_response(_rpc_result(recorded, payload))
+
+def make_app(fixtures_dir=FIXTURES_DIR, interval=0.5, loop=True, latency=0.0, jitter=0.0, error_rate=0.0, error_status=503):
+    """Local stand-in for the upstreams: exchange WebSocket feeds at /ws/<adapter key> and
+    REST APIs at /http/<host>/<path> and the Cronos JSON-RPC node at /http/evm.cronos.org/
+    (see UPSTREAM_HTTP_OVERRIDE)."""
+    app = web.Application()
+    app["settings"] = {"fixtures_dir": fixtures_dir, "interval": interval, "loop": loop, "latency": latency,
+                       "jitter": jitter, "error_rate": error_rate, "error_status": error_status}
+    app["recorded"] = {}  # Fixture file -> parsed JSON, loaded on first use
+    app.router.add_get("/ws/{venue}", replay_ws)
+    app.router.add_get("/http/{host}/{path:.*}", replay_http)
+    app.router.add_post("/http/{host}/{path:.*}", replay_rpc)
+    return app
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve recorded upstream responses locally.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between replayed frames")
+    parser.add_argument("--once", action="store_true", help="close each stream after one pass instead of looping")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every REST response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random delay of up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of REST requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+    args = parser.parse_args()
+    print(f"Point the bot at it with UPSTREAM_HTTP_OVERRIDE=http://127.0.0.1:{args.port}/http "
+          f"and/or EXCHANGE_STREAMING=1 EXCHANGE_WS_OVERRIDE=ws://127.0.0.1:{args.port}/ws")
+    app = make_app(args.fixtures, args.interval, not args.once, args.latency, args.jitter, args.error_rate, args.error_status)
+    web.run_app(app, host="127.0.0.1", port=args.port)
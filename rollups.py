@@ -0,0 +1,89 @@
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta
+import db
+from amounts import EXACT
+from formatting import format_age
+from tracking import CDC_GROUP, current
+
+# 📌 Rollup resolutions, finest first: (name, bucket width, bucket start for a date)
+RESOLUTIONS = [
+    ("day", timedelta(days=1), lambda d: d),
+    ("week", timedelta(days=7), lambda d: d - timedelta(days=d.weekday())),
+    ("month", timedelta(days=30), lambda d: d.replace(day=1)),
+]
+
+def _rollup_rows(moment, symbol, values):
+    for name, _, bucket_start in RESOLUTIONS:
+        bucket = bucket_start(moment.date())
+        for key, value in values.items():
+            yield (name, symbol, key, bucket, value, value, value, moment)
+
+async def record(moment, symbol, values):
+    """Folds one snapshot of `symbol` ({wallet address or group name: value}) into every rollup in a single transaction."""
+    await db.execute_many("upsert_balance_rollup", _rollup_rows(moment, symbol, values))
+
+async def backfill():
+    """One-time rollup build from the stored balances, if the rollup table is still empty.
+
+    Group totals are summed with the wallet groups as they are configured now.
+    """
+    (count,), = await db.fetch("count_balance_rollup")
+    if count:
+        return
+    groups = {wallet.address: wallet.group for wallet in (await current()).wallets}
+    snapshots = defaultdict(dict)  # (ts, symbol) -> {address: amount}
+    for moment, symbol, wallet, amount in await db.fetch("select_wallet_balances_all"):
+        snapshots[(moment, symbol)][wallet] = amount
+    rows = []
+    for (moment, symbol), balances in snapshots.items():
+        values = dict(balances)
+        for address, amount in balances.items():
+            if address in groups:
+                values[groups[address]] = EXACT.add(values.get(groups[address], 0), amount)
+        rows.extend(_rollup_rows(moment, symbol, values))
+    await db.execute_many("upsert_balance_rollup", rows)
+    print(f"Backfilled {len(rows)} balance rollup rows")
+
+def pick_resolution(step):
+    """Coarsest rollup whose buckets are no wider than `step` (name and bucket start function), or None
+    when a day is already wider than `step` and snapshots are downsampled instead."""
+    fitting = [(name, bucket_start) for name, width, bucket_start in RESOLUTIONS if width <= step]
+    return fitting[-1] if fitting else None
+
+def _fold(rows, points):
+    """Merges consecutive (bucket, min, max, last) rows into at most `points` rows of as even a size as possible,
+    the larger ones oldest. Returns the rows and the (smallest, largest) number of rows merged into one."""
+    if len(rows) <= points:
+        return rows, (1, 1)
+    size, extra = divmod(len(rows), points)
+    folded, start = [], 0
+    for index in range(points):
+        chunk = rows[start:start + size + (index < extra)]
+        start += len(chunk)
+        folded.append((chunk[0][0], min(row[1] for row in chunk), max(row[2] for row in chunk), chunk[-1][3]))
+    return folded, (size, size + (extra > 0))
+
+async def history(days, points, symbol, group=CDC_GROUP):
+    """At most `points` (bucket, min, max, last) rows of `group`'s total `symbol` balance over the last `days` days,
+    and the width of a row as a label.
+
+    Reads the coarsest rollup whose buckets are no wider than days/points, so the cost tracks `points`,
+    not the number of raw snapshots in the range. Below a day, snapshots are downsampled in the query
+    into slots counted from the start of the range. Rollup rows past `points` (including the calendar
+    bucket straddling the start of the range) are merged, never dropped.
+    """
+    step = timedelta(days=days) / points
+    picked = pick_resolution(step)
+    since = datetime.utcnow() - timedelta(days=days)
+    if picked is None:
+        slot_seconds = math.ceil(step.total_seconds())
+        rows = await db.fetch("select_group_balance_slots", since, slot_seconds, symbol, group, since)
+        resolution = format_age(slot_seconds)
+    else:
+        resolution, bucket_start = picked
+        rows = await db.fetch("select_balance_rollup", resolution, symbol, group, bucket_start(since.date()))
+    rows, (fewest, most) = _fold(rows, points)
+    if most > 1:
+        resolution = f"{most if fewest == most else f'{fewest}-{most}'} × {resolution}"
+    return resolution, rows
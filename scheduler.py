@@ -0,0 +1,126 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import time
+from urllib.parse import urlsplit
+from config import CRONOS_RPC_URL, RATE_LIMITS
+from metrics import observe
+
+# 📌 Request priorities, lowest first; background work is the default
+INTERACTIVE, BACKGROUND = 0, 1
+PRIORITY = contextvars.ContextVar("upstream_priority", default=BACKGROUND)
+
+# Which rate limit a REST call counts against, by host
+API_HOSTS = {
+    "api.gateio.ws": "gateio",
+    "ascendex.com": "ascendex",
+    "api.crypto.com": "cryptocom",
+    "api.cronoscan.com": "cronoscan",
+    "pro-api.coinmarketcap.com": "cmc",
+    urlsplit(CRONOS_RPC_URL).hostname: "cronosrpc",
+}
+
+class TokenBucket:
+    """`rate` requests per second with bursts of up to `burst`.
+
+    When the bucket is empty, callers queue and are let through one token at a time,
+    lowest priority value first, then in arrival order.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._waiters = []  # Heap of (priority, arrival, future)
+        self._arrivals = itertools.count()
+        self._timer = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, priority=BACKGROUND):
+        self._refill()
+        if not self._waiters and self.tokens >= 1:
+            self.tokens -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._arrivals), future))
+        self._schedule()
+        await future  # A cancelled waiter is skipped when its turn comes
+
+    def pause(self, seconds):
+        """Empties the bucket for `seconds`, e.g. after the API answered 429 anyway."""
+        self._refill()
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._schedule()
+
+    def _schedule(self):
+        if self._timer is None and self._waiters:
+            delay = max(0.0, (1 - self.tokens) / self.rate)
+            self._timer = asyncio.get_running_loop().call_later(delay, self._wake)
+
+    def _wake(self):
+        self._timer = None
+        self._refill()
+        while self._waiters and self.tokens >= 1:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self.tokens -= 1
+                future.set_result(None)
+        self._schedule()
+
+    def fail_waiters(self, error):
+        """Raises `error` in every queued caller, e.g. once its API is known to be down."""
+        waiters, self._waiters = self._waiters, []
+        for _, _, future in waiters:
+            if not future.done():
+                future.set_exception(error)
+
+    @property
+    def queued(self):
+        return sum(not future.done() for _, _, future in self._waiters)
+
+BUCKETS = {api: TokenBucket(rate, burst) for api, (rate, burst) in RATE_LIMITS.items()}
+
+def api_of(url):
+    """Name of the API `url` belongs to, or its bare host for APIs not listed in API_HOSTS."""
+    hostname = urlsplit(url).hostname
+    return API_HOSTS.get(hostname, hostname)
+
+def _bucket(url):
+    api = api_of(url)
+    return api, BUCKETS.get(api)
+
+async def wait_turn(url):
+    """Waits until `url`'s API has a request to spare; hosts without a limit pass straight through."""
+    api, bucket = _bucket(url)
+    if bucket is None:
+        return
+    start = time.perf_counter()
+    await bucket.acquire(PRIORITY.get())
+    observe("upstream_queue_seconds", time.perf_counter() - start, "api", api)
+
+def fail_queued(api, error):
+    """Fails every request still queued for `api`'s rate limit with `error`."""
+    bucket = BUCKETS.get(api)
+    if bucket is not None:
+        bucket.fail_waiters(error)
+
+def throttled(url, retry_after):
+    """Backs `url`'s API off for `retry_after` seconds."""
+    _, bucket = _bucket(url)
+    if bucket is not None:
+        bucket.pause(retry_after)
+
+async def interactive(awaitable):
+    """Task body running `awaitable` at user-command priority, for requests that arrive without
+    a command context (e.g. calls forwarded by a shard)."""
+    PRIORITY.set(INTERACTIVE)
+    return await awaitable
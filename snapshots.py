@@ -0,0 +1,140 @@
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import db
+import rollups
+from config import CDC_SNAPSHOT_INTERVAL, DEFAULT_WALLETS
+from amounts import from_wei, to_wei, percentage
+from get_balances import get_balances
+from tracking import DEFAULT_SYMBOL, current
+from transfers import indexer
+
+@dataclass(frozen=True)
+class Snapshot:
+    """One token's balances in every tracked wallet at one moment."""
+    taken_at: datetime  # UTC, start of the snapshot bucket when read back from the DB
+    token: object  # tracking.Token
+    wallets: tuple  # tracking.Wallet, display order
+    balances: dict  # address -> exact Decimal, or None when it couldn't be fetched
+    stale: bool = False  # Last complete snapshot, served because a live one couldn't be taken
+
+    @property
+    def age(self):
+        """Seconds since `taken_at`."""
+        return (datetime.now(timezone.utc).replace(tzinfo=None) - self.taken_at).total_seconds()
+
+    @property
+    def complete(self):
+        return all(self.balances.get(wallet.address) is not None for wallet in self.wallets)
+
+    def group(self, name):
+        """(Wallet, balance) for the wallets of group `name`."""
+        return [(wallet, self.balances.get(wallet.address)) for wallet in self.wallets if wallet.group == name]
+
+    def total(self, name):
+        """Exact total of group `name`, or None unless every balance in it is known."""
+        balances = [balance for _, balance in self.group(name)]
+        if not balances or None in balances:
+            return None
+        return from_wei(sum(to_wei(balance, self.token.decimals) for balance in balances), self.token.decimals)
+
+    def supply_percentage(self, name):
+        total = self.total(name)
+        return None if total is None else percentage(to_wei(total, self.token.decimals), self.token.supply_wei)
+
+    def rollup_values(self):
+        """Rollup key (wallet address or group name) -> value."""
+        values = dict(self.balances)
+        for group in dict.fromkeys(wallet.group for wallet in self.wallets):
+            values[group] = self.total(group)
+        return values
+
+_latest = {}  # symbol -> last complete Snapshot, served by !cdc without touching the chain
+
+def snapshot_bucket(moment):
+    """Start of the CDC_SNAPSHOT_INTERVAL bucket containing `moment` (naive UTC)."""
+    epoch = int(moment.replace(tzinfo=timezone.utc).timestamp())
+    return datetime.fromtimestamp(epoch - epoch % CDC_SNAPSHOT_INTERVAL, timezone.utc).replace(tzinfo=None)
+
+async def take_snapshot():
+    """Snapshots every tracked token at once and returns {symbol: Snapshot}.
+
+    Balances come from the transfer index where it is current and from one batched balance read
+    for the rest. A token's snapshot is upserted into its bucket and cached only when every one of
+    its balances is known, so a failed fetch never lands in the history as a zero or a gap.
+    """
+    tracking = await current()
+    pairs = tracking.pairs()
+    balances = indexer.balances(pairs)
+    balances.update(await get_balances([(token, wallet) for token, wallet in pairs
+                                        if (token.symbol, wallet.address) not in balances]))
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    snapshots = {
+        token.symbol: Snapshot(now, token, tracking.wallets,
+                               {wallet.address: balances.get((token.symbol, wallet.address)) for wallet in tracking.wallets})
+        for token in tracking.tokens
+    }
+    complete = [snapshot for snapshot in snapshots.values() if snapshot.complete]
+    if complete:
+        bucket = snapshot_bucket(now)
+        await db.execute_many("upsert_wallet_balance", [
+            (bucket, snapshot.token.symbol, address, balance)
+            for snapshot in complete for address, balance in snapshot.balances.items()
+        ])
+        await asyncio.gather(*(rollups.record(now, snapshot.token.symbol, snapshot.rollup_values()) for snapshot in complete))
+        _latest.update((snapshot.token.symbol, snapshot) for snapshot in complete)
+    return snapshots
+
+async def latest_snapshot(symbol=DEFAULT_SYMBOL):
+    """Latest complete snapshot of `symbol` from memory, else from the DB; None if nothing was recorded
+    yet or the token isn't tracked. Re-read whenever the tracked wallets changed."""
+    tracking = await current()
+    token = tracking.token(symbol)
+    if token is None:
+        return None
+    snapshot = _latest.get(token.symbol)
+    if snapshot is None or snapshot.token != token or snapshot.wallets != tracking.wallets:
+        rows = await db.fetch("select_latest_balances", token.symbol, token.symbol, 1)
+        if not rows:
+            return None
+        balances = {wallet: amount for _, wallet, amount in rows}
+        snapshot = _latest[token.symbol] = Snapshot(
+            rows[0][0], token, tracking.wallets, {wallet.address: balances.get(wallet.address) for wallet in tracking.wallets})
+    return snapshot
+
+async def migrate_caw_cdc():
+    """One-time copy of the old one-column-per-wallet caw_cdc rows into wallet_balances, if that is still empty."""
+    (exists,), = await db.fetch("exists_wallet_balances")
+    if exists:
+        return
+    addresses = [address.lower() for address, _, _ in DEFAULT_WALLETS]
+    rows = []
+    for moment, *balances in await db.fetch("select_caw_cdc_legacy"):
+        if isinstance(moment, str):  # SQLite returns expressions untyped
+            moment = datetime.fromisoformat(moment)
+        elif not isinstance(moment, datetime):
+            moment = datetime.combine(moment, datetime.min.time())
+        rows.extend((moment, DEFAULT_SYMBOL, address, balance) for address, balance in zip(addresses, balances)
+                    if balance is not None)
+    if rows:
+        await db.execute_many("upsert_wallet_balance", rows)
+        print(f"Copied {len(rows)} caw_cdc balances into wallet_balances")
+
+async def collect_snapshots_forever():
+    """Background task: snapshots balances once per CDC_SNAPSHOT_INTERVAL."""
+    try:
+        await migrate_caw_cdc()
+        await rollups.backfill()
+    except Exception as e:
+        print(f"CDC history migration or rollup backfill failed: {e}")
+    while True:
+        try:
+            snapshots = await take_snapshot()
+            skipped = [symbol for symbol, snapshot in snapshots.items() if not snapshot.complete]
+            if skipped:
+                print(f"Snapshot skipped for {', '.join(skipped)}: some balances could not be fetched")
+        except Exception as e:
+            print(f"Balance snapshot failed: {e}")
+        now = datetime.now(timezone.utc).timestamp()
+        await asyncio.sleep(CDC_SNAPSHOT_INTERVAL - now % CDC_SNAPSHOT_INTERVAL + 1)
@@ -0,0 +1,120 @@
+import asyncio
+import time
+from array import array
+from datetime import datetime, timedelta
+import db
+from config import TICK_BUFFER_SIZE, TICK_FLUSH_INTERVAL
+
+class TickBuffer:
+    """Fixed-size ring buffer of (timestamp, bid, ask) held in three float arrays."""
+
+    def __init__(self, size=TICK_BUFFER_SIZE):
+        self.size = size
+        self.ts = array("d", bytes(8 * size))
+        self.bid = array("d", bytes(8 * size))
+        self.ask = array("d", bytes(8 * size))
+        self.count = 0  # Ticks ever appended
+        self.flushed = 0  # Ticks already written to the DB
+
+    def append(self, ts, bid, ask):
+        i = self.count % self.size
+        self.ts[i], self.bid[i], self.ask[i] = ts, bid, ask
+        self.count += 1
+
+    def since(self, start):
+        """Ticks appended from index `start` onward that are still in the buffer, oldest first."""
+        start = max(start, self.count - self.size)
+        for n in range(start, self.count):
+            i = n % self.size
+            yield self.ts[i], self.bid[i], self.ask[i]
+
+    @property
+    def oldest(self):
+        return self.ts[(self.count - min(self.count, self.size)) % self.size] if self.count else None
+
+class TickRecorder:
+    """Keeps every quote the bot sees and flushes them to price_ticks in batches."""
+
+    def __init__(self):
+        self.buffers = {}  # exchange name -> TickBuffer
+        self._partitions = set()  # Months whose partition is known to exist
+        self._flush_lock = asyncio.Lock()  # Concurrent flushes would write the same unflushed ticks twice
+
+    def record(self, quote):
+        buffer = self.buffers.get(quote.exchange)
+        if buffer is None:
+            buffer = self.buffers[quote.exchange] = TickBuffer()
+        buffer.append(quote.received_at, float(quote.bid), float(quote.ask))
+
+    async def _ensure_partitions(self, rows):
+        await db.connect()
+        if db.backend() != "postgres":
+            return
+        months = {ts.replace(day=1, hour=0, minute=0, second=0, microsecond=0) for ts, *_ in rows} - self._partitions
+        statements = []
+        for month in months:
+            next_month = (month + timedelta(days=32)).replace(day=1)
+            statements.append(f"CREATE TABLE IF NOT EXISTS price_ticks_{month:%Y_%m} PARTITION OF price_ticks "
+                              f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{next_month:%Y-%m-%d}')")
+        if statements:
+            await db.run_script(statements)
+        self._partitions |= months  # Only once created, so a failed attempt is retried on the next flush
+
+    async def flush(self):
+        async with self._flush_lock:
+            return await self._flush()
+
+    async def _flush(self):
+        rows, marks = [], {}
+        for exchange, buffer in self.buffers.items():
+            rows.extend((datetime.utcfromtimestamp(ts), exchange, bid, ask) for ts, bid, ask in buffer.since(buffer.flushed))
+            marks[exchange] = buffer.count
+        if rows:
+            await self._ensure_partitions(rows)
+            await db.execute_many("insert_price_tick", rows)
+        for exchange, count in marks.items():
+            self.buffers[exchange].flushed = count
+        return len(rows)
+
+    async def flush_forever(self):
+        while True:
+            await asyncio.sleep(TICK_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Tick flush failed: {e}")
+
+    async def slots(self, minutes, slot_count):
+        """{slot start epoch: {exchange: (bid, ask)}} averaged per slot over the last `minutes`.
+
+        Served from the ring buffers when they reach back far enough, else from price_ticks.
+        """
+        slot_seconds = max(1, minutes * 60 // slot_count)
+        start = time.time() - minutes * 60
+        result = {}
+        if self.buffers and all(buffer.oldest is not None and buffer.oldest <= start for buffer in self.buffers.values()):
+            sums = {}
+            for exchange, buffer in self.buffers.items():
+                for ts, bid, ask in buffer.since(0):
+                    if ts >= start:
+                        entry = sums.setdefault((int(ts // slot_seconds), exchange), [0.0, 0.0, 0])
+                        entry[0] += bid
+                        entry[1] += ask
+                        entry[2] += 1
+            for (slot, exchange), (bid, ask, n) in sums.items():
+                result.setdefault(slot * slot_seconds, {})[exchange] = (bid / n, ask / n)
+        else:
+            await self.flush()
+            for exchange, slot, bid, ask in await db.fetch("select_price_tick_slots", slot_seconds, datetime.utcfromtimestamp(start)):
+                result.setdefault(int(slot) * slot_seconds, {})[exchange] = (float(bid), float(ask))
+        return dict(sorted(result.items()))
+
+recorder = TickRecorder()
+
+def best_spread_pct(venues):
+    """Widest cross-venue (bid - ask) / ask in % from {exchange: (bid, ask)}, or None with fewer than two venues."""
+    spreads = [(sell_bid - buy_ask) * 100 / buy_ask
+               for buy, (_, buy_ask) in venues.items()
+               for sell, (sell_bid, _) in venues.items()
+               if buy != sell and buy_ask]
+    return max(spreads, default=None)
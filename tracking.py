@@ -0,0 +1,108 @@
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import db
+from cache import QuoteCache
+from config import DEFAULT_TOKENS, DEFAULT_WALLETS, TRACKING_RELOAD_INTERVAL
+
+# 📌 Wallet groups the CDC commands read, and the token they show by default
+CDC_GROUP = "cdc"
+BURN_GROUP = "burn"
+DEFAULT_SYMBOL = DEFAULT_TOKENS[0][0]
+
+ADDRESS = re.compile(r"0x[0-9a-fA-F]{40}")
+
+@dataclass(frozen=True)
+class Token:
+    symbol: str
+    contract: str  # lowercase
+    decimals: int
+    total_supply: int  # Whole tokens
+    start_block: int  # The transfer indexer sums balances from here: not after the contract deployment
+
+    @property
+    def supply_wei(self):
+        return self.total_supply * 10**self.decimals
+
+@dataclass(frozen=True)
+class Wallet:
+    address: str  # lowercase
+    group: str
+    title: str
+
+@dataclass(frozen=True)
+class Tracking:
+    """Every tracked token and wallet; each wallet is tracked for every token."""
+    tokens: tuple
+    wallets: tuple  # Display order
+
+    def token(self, symbol):
+        return next((token for token in self.tokens if token.symbol == symbol.upper()), None)
+
+    def group(self, name):
+        return tuple(wallet for wallet in self.wallets if wallet.group == name)
+
+    def groups(self):
+        return list(dict.fromkeys(wallet.group for wallet in self.wallets))
+
+    def pairs(self):
+        """(Token, Wallet) for everything whose balance is collected."""
+        return [(token, wallet) for token in self.tokens for wallet in self.wallets]
+
+_cache = QuoteCache(TRACKING_RELOAD_INTERVAL, max_entries=1)
+_marked_seeded = False  # This process already made sure the seeded flag is set
+
+async def _seed():
+    await db.execute_batch(
+        [("upsert_tracked_token", (symbol.upper(), contract.lower(), decimals, total_supply, start_block))
+         for symbol, contract, decimals, total_supply, start_block in DEFAULT_TOKENS]
+        + [("upsert_tracked_wallet", (address.lower(), group, title)) for address, group, title in DEFAULT_WALLETS]
+        + [("insert_tracking_seeded", (datetime.now(timezone.utc).replace(tzinfo=None),))]
+    )
+
+async def _load():
+    global _marked_seeded
+    tokens, wallets = await db.fetch("select_tracked_tokens"), await db.fetch("select_tracked_wallets")
+    if not tokens and not wallets:
+        (seeded,), = await db.fetch("count_tracking_seeded")
+        if not seeded:
+            await _seed()
+            tokens, wallets = await db.fetch("select_tracked_tokens"), await db.fetch("select_tracked_wallets")
+    elif not _marked_seeded:
+        await db.execute("insert_tracking_seeded", datetime.now(timezone.utc).replace(tzinfo=None))  # Tables from before the flag existed
+    _marked_seeded = True
+    return Tracking(
+        tuple(Token(symbol, contract, decimals, int(total_supply), start_block)
+              for symbol, contract, decimals, total_supply, start_block in tokens),
+        tuple(Wallet(address, group, title) for address, group, title in wallets),
+    )
+
+async def current():
+    """Tracked tokens and wallets, re-read from the DB at most every TRACKING_RELOAD_INTERVAL seconds.
+
+    The tables are seeded from DEFAULT_TOKENS / DEFAULT_WALLETS once, when first created; untracking
+    everything later leaves them empty.
+    """
+    return await _cache.get_or_fetch("tracking", _load)
+
+# 📌 Edits; this process sees them at once, others within TRACKING_RELOAD_INTERVAL
+
+def _check_address(address):
+    if not ADDRESS.fullmatch(address):
+        raise ValueError(f"{address} is not an address (0x and 40 hex digits)")
+
+async def track_token(symbol, contract, decimals, total_supply, start_block=0):
+    _check_address(contract)
+    await db.execute("upsert_tracked_token", symbol.upper(), contract.lower(), decimals, total_supply, start_block)
+    _cache.invalidate("tracking")
+
+async def track_wallet(address, group, title):
+    _check_address(address)
+    await db.execute("upsert_tracked_wallet", address.lower(), group.lower(), title)
+    _cache.invalidate("tracking")
+
+async def untrack(key):
+    """Stops tracking a token symbol or a wallet address; returns how many were removed."""
+    removed = await db.execute("delete_tracked_token", key.upper()) + await db.execute("delete_tracked_wallet", key.lower())
+    _cache.invalidate("tracking")
+    return removed
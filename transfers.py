@@ -0,0 +1,151 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import aiohttp
+import db
+from config import BALANCE_TIMEOUT, TRANSFER_PAGE_SIZE, TRANSFER_POLL_INTERVAL, TRANSFER_MAX_LAG
+from upstream import get_json
+from amounts import from_wei, to_wei
+from get_balances import API_KEY_CRONOSCAN, RateLimited, _is_rate_limited
+from health import describe
+from tracking import current
+
+CRONOSCAN_API_URL = "https://api.cronoscan.com/api"
+
+@dataclass(frozen=True)
+class WalletIndex:
+    cursor_block: int  # Every transfer up to and including this block is indexed
+    balance: int  # wei
+    inflow: int
+    outflow: int
+
+async def _fetch_transfers(token, address, start_block, end_block=999_999_999, page=1):
+    """Page `page` of TRANSFER_PAGE_SIZE transfers of `token` to or from `address` between `start_block`
+    and `end_block`, oldest first."""
+    data = await get_json(CRONOSCAN_API_URL, BALANCE_TIMEOUT, params={
+        "module": "account", "action": "tokentx", "contractaddress": token.contract, "address": address,
+        "startblock": start_block, "endblock": end_block, "page": page, "offset": TRANSFER_PAGE_SIZE,
+        "sort": "asc", "apikey": API_KEY_CRONOSCAN,
+    })
+    if data["status"] == "1":
+        return data["result"]
+    if "no transactions found" in str(data.get("message", "")).lower():
+        return []
+    if _is_rate_limited(data):
+        raise RateLimited(data.get("result"))
+    raise ValueError(data.get("message"))
+
+class TransferIndexer:
+    """Follows transfers of every tracked token in and out of every tracked wallet from a block cursor onward.
+
+    Each page of transfers is stored together with the (token, wallet)'s new cursor, balance and
+    in/outflow totals in one transaction, so a crash never counts a transfer twice. Tokens and
+    wallets added while running are picked up, from the token's start block, on the next sync.
+    """
+
+    def __init__(self):
+        self._index = None  # (symbol, address) -> WalletIndex, loaded on the first sync
+        self._synced_at = {}  # (symbol, address) -> monotonic time its index last reached the chain head
+        self._inflight = None  # The running sync; concurrent callers share it, or both would index the same pages
+
+    async def _load(self, tracking):
+        decimals = {token.symbol: token.decimals for token in tracking.tokens}
+        self._index = {
+            (symbol, wallet): WalletIndex(cursor, *(to_wei(amount, decimals[symbol]) for amount in (balance, inflow, outflow)))
+            for symbol, wallet, cursor, balance, inflow, outflow in await db.fetch("select_token_wallet_index")
+            if symbol in decimals
+        }
+
+    async def _sync_pair(self, token, address):
+        key = (token.symbol, address)
+        state = self._index.get(key) or WalletIndex(token.start_block - 1, 0, 0, 0)
+        while True:
+            transfers = await _fetch_transfers(token, address, state.cursor_block + 1)
+            full = len(transfers) >= TRANSFER_PAGE_SIZE
+            last_block = int(transfers[-1]["blockNumber"]) if transfers else None
+            if full and int(transfers[0]["blockNumber"]) != last_block:
+                # The page may have cut the last block short; it is fetched again from its start
+                transfers = [transfer for transfer in transfers if int(transfer["blockNumber"]) != last_block]
+            elif full:
+                # The whole page is one block, which may hold more; the rest of it is paged through before moving on
+                page = transfers
+                while len(page) >= TRANSFER_PAGE_SIZE:
+                    page = await _fetch_transfers(token, address, last_block, last_block,
+                                                  len(transfers) // TRANSFER_PAGE_SIZE + 1)
+                    transfers = transfers + page
+            if not transfers:
+                break
+
+            balance, inflow, outflow = state.balance, state.inflow, state.outflow
+            steps = []
+            for transfer in transfers:
+                sender, receiver = transfer["from"].lower(), transfer["to"].lower()
+                if sender == receiver:
+                    continue
+                value = int(transfer["value"])
+                if receiver == address:
+                    balance, inflow, signed, counterparty = balance + value, inflow + value, value, sender
+                else:
+                    balance, outflow, signed, counterparty = balance - value, outflow + value, -value, receiver
+                ts = datetime.fromtimestamp(int(transfer["timeStamp"]), timezone.utc).replace(tzinfo=None)
+                steps.append(("insert_token_transfer", (token.symbol, address, int(transfer["blockNumber"]), ts,
+                                                        transfer["hash"], counterparty, from_wei(signed, token.decimals))))
+            state = WalletIndex(int(transfers[-1]["blockNumber"]), balance, inflow, outflow)
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            steps.append(("upsert_token_wallet_index", (token.symbol, address, state.cursor_block,
+                                                        *(from_wei(amount, token.decimals) for amount in (balance, inflow, outflow)),
+                                                        now)))
+            await db.execute_batch(steps)
+            self._index[key] = state
+            if not full:
+                break
+        self._synced_at[key] = time.monotonic()
+
+    async def sync(self):
+        """Indexes every tracked token and wallet up to the chain head; returns False (and logs why) if any failed."""
+        if self._inflight is None:
+            self._inflight = asyncio.create_task(self._sync())
+        # Shield so a caller hitting its own deadline doesn't cancel the sync for everyone else
+        return await asyncio.shield(self._inflight)
+
+    async def _sync(self):
+        try:
+            tracking = await current()
+            if self._index is None:
+                await self._load(tracking)
+            pairs = tracking.pairs()
+            results = await asyncio.gather(*(self._sync_pair(token, wallet.address) for token, wallet in pairs),
+                                           return_exceptions=True)
+        finally:
+            self._inflight = None
+        failures = 0
+        for (token, wallet), result in zip(pairs, results):
+            if isinstance(result, (RateLimited, asyncio.TimeoutError, aiohttp.ClientError, KeyError, ValueError)):
+                print(f"Transfer indexing failed for {token.symbol} {wallet.address}: {describe(result)}")
+                failures += 1
+            elif isinstance(result, BaseException):
+                raise result
+        return not failures
+
+    async def run_forever(self):
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                print(f"Transfer indexing failed: {e}")
+            await asyncio.sleep(TRANSFER_POLL_INTERVAL)
+
+    def balances(self, pairs):
+        """{(symbol, address): exact Decimal balance} for those (Token, Wallet) pairs indexed up to the
+        chain head within TRANSFER_MAX_LAG seconds; the rest are left out."""
+        now = time.monotonic()
+        balances = {}
+        for token, wallet in pairs:
+            key = (token.symbol, wallet.address)
+            if now - self._synced_at.get(key, -TRANSFER_MAX_LAG - 1) <= TRANSFER_MAX_LAG:
+                state = self._index.get(key)
+                balances[key] = from_wei(state.balance if state else 0, token.decimals)
+        return balances
+
+indexer = TransferIndexer()
@@ -0,0 +1,65 @@
+import json
+from decimal import Decimal
+from functools import partial
+from urllib.parse import urlsplit
+import aiohttp
+from config import UPSTREAM_HTTP_OVERRIDE
+from metrics import http_trace_config
+from scheduler import api_of, fail_queued, wait_turn, throttled
+from health import OPEN_LISTENERS, guarded
+
+# JSON numbers with a fraction are decoded as Decimal so prices never pass through float
+_loads = partial(json.loads, parse_float=Decimal)
+
+# Requests queued behind a rate limit fail at once when their API's breaker opens
+OPEN_LISTENERS.append(fail_queued)
+
+# Shared pooled HTTP session for all upstream APIs (created lazily inside the event loop)
+_session = None
+
+def get_session():
+    """Returns the shared aiohttp session, creating it on first use."""
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(limit=50, limit_per_host=10, ttl_dns_cache=300)
+        _session = aiohttp.ClientSession(connector=connector, trace_configs=[http_trace_config()])
+    return _session
+
+async def close_session():
+    """Closes the shared session; called when the bot shuts down."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+def _route(url):
+    """`url`, or its local stand-in when UPSTREAM_HTTP_OVERRIDE is set."""
+    if not UPSTREAM_HTTP_OVERRIDE:
+        return url
+    parts = urlsplit(url)
+    return f"{UPSTREAM_HTTP_OVERRIDE.rstrip('/')}/{parts.netloc}{parts.path or '/'}" + (f"?{parts.query}" if parts.query else "")
+
+def _retry_after(response, default=1.0):
+    try:
+        return float(response.headers.get("Retry-After", default))
+    except ValueError:  # HTTP-date form
+        return default
+
+async def get_json(url, timeout, params=None, headers=None):
+    """GETs `url` on the shared session, within its API's rate limit and circuit breaker, and decodes the JSON body."""
+    async with guarded(api_of(url), lambda: wait_turn(url)):
+        async with get_session().get(_route(url), params=params, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            if response.status == 429:
+                throttled(url, _retry_after(response))
+            response.raise_for_status()
+            return await response.json(content_type=None, loads=_loads)
+
+async def post_json(url, timeout, payload):
+    """POSTs `payload` as JSON to `url` on the shared session, within its API's rate limit and circuit breaker,
+    and decodes the reply."""
+    async with guarded(api_of(url), lambda: wait_turn(url)):
+        async with get_session().post(_route(url), json=payload, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            if response.status == 429:
+                throttled(url, _retry_after(response))
+            response.raise_for_status()
+            return await response.json(content_type=None, loads=_loads)